@@ -0,0 +1,369 @@
+#! /usr/bin/python3
+
+#  Purpose   : benchmark zoompart.py stages on synthetic Zoom participant files
+#  Author    : Robbie Morrison <robbie.morrison@posteo.de> / GitHub @robbiemorrison
+#  Commenced : 17-Oct-2026
+#  Status    : beta
+#  Keywords  : python zoom participant-list benchmark
+
+#  OPEN LICENSE
+#
+#  Copyright (c) 2020 Robbie Morrison <robbie.morrison@posteo.de>
+#
+#  SPDX-License-Identifier: ISC
+#  License-Text:
+#
+#  ISC License
+#
+#  Permission to use, copy, modify, and/or distribute this software for any
+#  purpose with or without fee is hereby granted, provided that the above
+#  copyright notice and this permission notice appear in all copies.
+#
+#  The software is provided "as is" and the author disclaims all warranties
+#  with regard to this software including all implied warranties of
+#  merchantability and fitness.  In no event shall the author be liable for
+#  any special, direct, indirect, or consequential damages or any damages
+#  whatsoever resulting from loss of use, data or profits, whether in an
+#  action of contract, negligence or other tortious action, arising out of
+#  or in connection with the use or performance of this software.
+
+# --------------------------------------
+#  user defined variables
+# --------------------------------------
+
+sizesDefault = "1k,100k"                                              # session counts, 10M is available but opt-in
+rejoinDefault = 0.3                                                   # mean additional sessions per participant
+overlapDefault = 0.1                                                  # probability that a rejoin overlaps the previous session
+meetingMinutes = 150                                                  # synthetic meeting length
+loopLimitDefault = 5000                                               # largest file on which to time the reference loops
+inferLimitDefault = 20000                                             # largest file on which to time inferred date parsing
+startupBudget = 0.100                                                 # seconds, for argument errors and missing files
+chunkRows = 1000000                                                   # rows generated per write
+
+traceMemory = True                                                    # trace allocations, which slows pure python stages
+
+zoomTimeFmt = "%m/%d/%Y %I:%M:%S %p"                                  # 03/26/2020 02:23:34 PM
+
+# --------------------------------------
+#  version information
+# --------------------------------------
+
+versionStr = "0.1"                                                    # script version string
+
+# -------------------------------------
+#  modules
+# -------------------------------------
+
+import argparse                                   # argument parsing
+import importlib.util                             # optional pyarrow
+import os
+import resource                                   # peak resident set size
+import subprocess                                 # time script startup
+import sys
+import tempfile
+import time
+import tracemalloc                                # per-stage peak allocations
+
+import numpy
+import pandas
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import zoompart
+
+# -------------------------------------
+#  argument parsing
+# -------------------------------------
+
+description = "benchmark zoompart.py on synthetic Zoom participant files"
+
+epilog = """
+
+Synthetic participant CSV files are generated in both the older format, with
+two lines of meeting data, and the newer format without.  Each pipeline stage
+is then timed and its peak traced allocation recorded.  Sizes are given as
+session counts with optional k and M suffixes, for instance "1k,100k,10M".
+
+The row-by-row reference loops are timed only on files of up to --loop-limit
+sessions.  Reading with inferred rather than explicit timestamp formats, the
+former behaviour, is timed only on files of up to --infer-limit sessions.  The
+pyarrow CSV engine is timed when pyarrow is installed.  Script startup for a missing file is timed against a budget of
+{0:0.0f} ms.
+
+The grouped stocking engines are checked against the reference loops on every
+file timed with the loops, and every engine is run on small edge-case files,
+among them a file without session rows.  The script exits with failure on any
+disagreement.
+
+""".format(startupBudget * 1000)
+
+def argIsFraction(value):
+    floatvalue = float(value)
+    if not 0.0 <= floatvalue <= 1.0:
+        raise argparse.ArgumentTypeError("%s is not between zero and one" % value)
+    return floatvalue
+
+def argIsSizes(value):                            # parse "1k,100k,10M" into a list of integers
+    multipliers = { 'k' : 10**3, 'K' : 10**3, 'm' : 10**6, 'M' : 10**6 }
+    sizes = []
+    for item in value.split(','):
+        item = item.strip()
+        multiplier = multipliers.get(item[-1:], 1)
+        if item[-1:] in multipliers: item = item[:-1]
+        try:
+            sizes.append(int(float(item) * multiplier))
+        except ValueError:
+            raise argparse.ArgumentTypeError("%s is not a list of sizes" % value)
+    return sizes
+
+def makeParser():                                 # create command-line parser and return same
+    parser = argparse.ArgumentParser(description=description, epilog=epilog, formatter_class=argparse.RawDescriptionHelpFormatter)
+
+    parser.add_argument('-V', '--version',                             action='version',                    version='%(prog)s ' + ' : ' + versionStr)
+    parser.add_argument('-z', '--sizes',            dest="sizes",      action='store',      default=sizesDefault, type=argIsSizes,  help='session counts (default {0:s})'.format(sizesDefault))
+    parser.add_argument('-r', '--rejoin',           dest="rejoin",     action='store',      default=rejoinDefault, type=float,      help='mean rejoins per participant (default {0:0.2f})'.format(rejoinDefault))
+    parser.add_argument('-o', '--overlap',          dest="overlap",    action='store',      default=overlapDefault, type=argIsFraction, help='rejoin overlap probability (default {0:0.2f})'.format(overlapDefault))
+    parser.add_argument('-f', '--format',           dest="format",     action='store',      default='both', choices=['old', 'new', 'both'], help='CSV format (default both)')
+    parser.add_argument('-L', '--loop-limit',       dest="looplimit",  action='store',      default=loopLimitDefault, type=int,    help='largest file for the reference loops (default {0:d})'.format(loopLimitDefault))
+    parser.add_argument('-i', '--infer-limit',      dest="inferlimit", action='store',      default=inferLimitDefault, type=int,   help='largest file for inferred date parsing (default {0:d})'.format(inferLimitDefault))
+    parser.add_argument('-k', '--keep',             dest="keep",       action='store',      required=False,                         help='generate files into this directory and keep them')
+    parser.add_argument('-g', '--generate-only',    dest="genonly",    action='store_true', required=False,                         help='generate files without timing')
+    parser.add_argument('-m', '--no-memory',        dest="nomemory",   action='store_true', required=False,                         help='omit allocation tracing for more faithful timings')
+    parser.add_argument('-s', '--seed',             dest="seed",       action='store',      default=0, type=int,                    help='random seed (default 0)')
+
+    return parser
+
+# --------------------------------------
+#  generator
+# --------------------------------------
+
+def generateCsv(filename, sessions, preamble=True, rejoin=rejoinDefault, overlap=overlapDefault, seed=0):
+    """write a synthetic Zoom participant CSV file with 'sessions' rows
+
+    * participants have one session plus a Poisson number of rejoins with mean 'rejoin'
+    * a rejoin overlaps the previous session with probability 'overlap', otherwise a gap precedes it
+    * rows are shuffled, as Zoom does not sort by participant
+    """
+
+    rng = numpy.random.default_rng(seed)
+    start = pandas.Timestamp("2020-04-15 15:42:15")
+    meeting = meetingMinutes * 60                                     # seconds
+
+    # participants and their session counts
+
+    counts = 1 + rng.poisson(rejoin, size=max(1, int(sessions / (1.0 + rejoin))))
+    counts = counts[numpy.cumsum(counts) <= sessions]
+    shortfall = sessions - counts.sum()
+    counts = numpy.concatenate((counts, numpy.ones(shortfall, dtype=counts.dtype)))
+    people = numpy.repeat(numpy.arange(len(counts)), counts)
+    first = numpy.ones(len(people), dtype=bool)                       # first session of each participant
+    first[1:] = people[1:] != people[:-1]
+
+    # join and leave offsets in seconds, rejoins chain on from the previous session
+
+    lengths = rng.exponential(meeting / 2.0, size=len(people)).astype('int64') + 30
+    gaps = rng.integers(10, 600, size=len(people))
+    overlaps = rng.random(len(people)) < overlap
+    shifts = numpy.where(overlaps, -gaps // 2, gaps)
+    joins = numpy.empty(len(people), dtype='int64')
+    joins[first] = rng.integers(0, meeting // 2, size=first.sum())
+    leafs = numpy.empty(len(people), dtype='int64')
+    groupstart = numpy.maximum.accumulate(numpy.where(first, numpy.arange(len(people)), 0))
+    rank = numpy.arange(len(people)) - groupstart                     # session number within participant
+    for step in range(int(rank.max()) + 1):                           # one vectorized pass per rejoin depth
+        now = rank == step
+        if step > 0:
+            joins[now] = numpy.maximum(0, leafs[numpy.flatnonzero(now) - 1] + shifts[now])
+        leafs[now] = numpy.minimum(joins[now] + lengths[now], meeting + 600)
+    leafs = numpy.maximum(leafs, joins + 1)
+
+    # write in chunks of shuffled rows
+
+    order = rng.permutation(len(people))
+    with open(filename, 'w') as fd:
+        if preamble:
+            print("Meeting ID,Topic,Start Time,End Time,User Email,Duration (Minutes),Participants,", file=fd)
+            print("123456789,Synthetic meeting,{0:s},{1:s},host@example.org,{2:d},{3:d},".format(
+                  start.strftime(zoomTimeFmt), (start + pandas.Timedelta(seconds=meeting)).strftime(zoomTimeFmt),
+                  meetingMinutes, sessions), file=fd)
+            print("", file=fd)
+        print("Name (Original Name),User Email,Join Time,Leave Time,Duration (Minutes)", file=fd)
+        for i in range(0, len(order), chunkRows):
+            rows = order[i:i + chunkRows]
+            who = people[rows].astype(str)
+            frame = pandas.DataFrame({ 'name'  : numpy.char.add("Person ", who),
+                                       'email' : numpy.char.add(numpy.char.add("person", who), "@example.org"),
+                                       'join'  : (start + pandas.to_timedelta(joins[rows], unit='s')).strftime(zoomTimeFmt),
+                                       'leaf'  : (start + pandas.to_timedelta(leafs[rows], unit='s')).strftime(zoomTimeFmt),
+                                       'mins'  : numpy.ceil((leafs[rows] - joins[rows]) / 60.0).astype('int64') })
+            frame.to_csv(fd, header=False, index=False)
+    return len(counts)
+
+# --------------------------------------
+#  timing
+# --------------------------------------
+
+def timeStage(results, stage, func, *args):       # run 'func', record wall time and peak traced allocation, and return its result
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    tic = time.perf_counter()
+    value = func(*args)
+    toc = time.perf_counter()
+    peak = tracemalloc.get_traced_memory()[1] - base                  # zero when not tracing
+    results.append((stage, toc - tic, peak))
+    return value
+
+def readStage(csvtarget, engine='c'):             # single-pass read as in 'zoompart.stockCsv'
+    with zoompart.openCsv(csvtarget) as fd:
+        meta, names = zoompart.readMeta(fd)
+        return zoompart.readCsv(fd, names, engine)
+
+def readInferredStage(csvtarget):                 # former read, all columns and inferred timestamp formats
+    with zoompart.openCsv(csvtarget) as fd:
+        meta, names = zoompart.readMeta(fd)
+        return pandas.read_csv(fd, header=None, names=names, parse_dates=['Join Time', 'Leave Time'])
+
+def sameDurations(df2, df3, mainkey):             # whether two stocked dataframes hold the same duration for each participant
+    first = df2.set_index(mainkey)['Delta'].astype('float64').round(4).sort_index()
+    second = df3.set_index(mainkey)['Delta'].astype('float64').round(4).sort_index()
+    return first.index.equals(second.index) and numpy.array_equal(first.to_numpy(), second.to_numpy())
+
+def benchFile(csvtarget, sessions, looplimit, inferlimit, mismatches):  # time each pipeline stage on 'csvtarget' and return results
+    results = []
+    mainkey = 'Email'
+    if traceMemory: tracemalloc.start()
+    if sessions <= inferlimit:
+        timeStage(results, "readCsvInferred", readInferredStage, csvtarget)
+    if importlib.util.find_spec('pyarrow') is not None:
+        timeStage(results, "readCsvPyarrow", readStage, csvtarget, 'pyarrow')
+    df = timeStage(results, "readCsv", readStage, csvtarget)
+    timeStage(results, "validateSessions", zoompart.validateSessions, df, mainkey)
+    df2 = timeStage(results, "createSecondDf", zoompart.createSecondDf, df, mainkey)
+    df4 = timeStage(results, "stockIgnoreGaps", zoompart.stockSecondDfIgnoreGaps, df, df2.copy(), mainkey)
+    df3 = timeStage(results, "stockConsiderGaps", zoompart.stockSecondDfConsiderGaps, df, df2.copy(), mainkey)
+    if sessions <= looplimit:                     # the grouped engines must match the reference loops
+        df5 = timeStage(results, "stockIgnoreGapsLoop", zoompart.stockSecondDfIgnoreGapsLoop, df, df2.copy(), mainkey)
+        if not sameDurations(df4, df5, mainkey): mismatches.append(csvtarget + " ignoring gaps")
+        df5 = timeStage(results, "stockConsiderGapsLoop", zoompart.stockSecondDfConsiderGapsLoop, df, df2.copy(), mainkey)
+        if not sameDurations(df3, df5, mainkey): mismatches.append(csvtarget + " considering gaps")
+        del df5
+    intervals = timeStage(results, "mergeIntervals", zoompart.mergeIntervals, df, mainkey)
+    timeStage(results, "sweepTimeline", zoompart.sweepTimeline, intervals)
+    column = timeStage(results, "extractCol", zoompart.extractCol, df3, 'Delta', zoompart.cutoffDefault)
+    datfile = os.path.join(os.path.dirname(csvtarget), "bench.dat")
+    timeStage(results, "writeDatFile", zoompart.writeDatFile, datfile, column, "\n")
+    os.remove(datfile)
+    del df, df2, df3, df4
+    with zoompart.openCsv(csvtarget) as fd:
+        meta, names = zoompart.readMeta(fd)
+        timeStage(results, "streamCsv", zoompart.streamCsv, fd, names, mainkey, False, 100000)
+    if traceMemory: tracemalloc.stop()
+    return results
+
+# edge cases that every engine must survive with the expected durations, as session rows
+# of name, email, join, and leave offsets in seconds, then minutes ignoring and considering gaps
+
+edgeCases = { 'no-sessions'   : ([], [], []),
+              'missing-keys'  : ([ ("Ann", "", 0, 3600), ("Bob", "", 600, 1200) ], [], []),
+              'same-join'     : ([ ("Ann", "ann@x.org", 0, 3600), ("Ann", "ann@x.org", 0, 1800), ("Ann", "ann@x.org", 2400, 3000) ], [60.0], [60.0]) }
+
+def checkEdgeCases(workdir):                      # run every engine on each edge case and return the disagreements
+    start = pandas.Timestamp("2020-04-15 10:00:00")
+    mismatches = []
+    for case, (rows, ignoring, considering) in sorted(edgeCases.items()):
+        csvtarget = os.path.join(workdir, "edge_{0:s}.csv".format(case))
+        with open(csvtarget, 'w') as fd:
+            print("Name (Original Name),User Email,Join Time,Leave Time,Duration (Minutes)", file=fd)
+            for name, email, join, leaf in rows:
+                print("{0:s},{1:s},{2:s},{3:s},{4:d}".format(name, email, (start + pandas.Timedelta(seconds=join)).strftime(zoomTimeFmt),
+                      (start + pandas.Timedelta(seconds=leaf)).strftime(zoomTimeFmt), (leaf - join + 59) // 60), file=fd)
+        for ignoregaps, expected in [(True, ignoring), (False, considering)]:
+            durations = {}
+            for engine, loopengine, chunksize in [("grouped", False, 0), ("loop", True, 0), ("stream", False, 2)]:
+                try:
+                    durations[engine] = zoompart.analyze(csvtarget, ignoregaps=ignoregaps, loopengine=loopengine, chunksize=chunksize).durations
+                except Exception as e:
+                    durations[engine] = "{0:s}: {1:s}".format(type(e).__name__, str(e))
+            if durations['grouped'] != expected or durations['loop'] != expected or (ignoregaps and durations['stream'] != expected):
+                mismatches.append("{0:s} {1:s} {2!r}".format(case, "ignoring gaps" if ignoregaps else "considering gaps", durations))
+        os.remove(csvtarget)
+    return mismatches
+
+def benchStartup():                               # time script startup on a missing file and return best of five
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "zoompart.py")
+    best = None
+    for i in range(5):
+        tic = time.perf_counter()
+        subprocess.run([sys.executable, script, "no-such-file.csv"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        toc = time.perf_counter()
+        if best is None or toc - tic < best: best = toc - tic
+    return best
+
+def sayResults(label, results):                   # tabulate stage results
+    zoompart.report()
+    zoompart.report(label)
+    zoompart.report()
+    for stage, seconds, peak in results:
+        zoompart.report(stage, "{0:10.4f} s".format(seconds), "{0:10.1f} MiB".format(peak / 2**20))
+
+# --------------------------------------
+#  command-line interface
+# --------------------------------------
+
+def main(argv=None):
+    global traceMemory
+
+    args = makeParser().parse_args(argv)
+    traceMemory = not args.nomemory
+    zoompart.quiet = True                         # silence pipeline reporting, restored for tables
+
+    if args.keep:
+        workdir = args.keep
+        os.makedirs(workdir, exist_ok=True)
+    else:
+        scratch = tempfile.TemporaryDirectory(prefix="zoombench-")
+        workdir = scratch.name
+
+    if   args.format == 'old': formats = [True]
+    elif args.format == 'new': formats = [False]
+    else:                      formats = [True, False]
+
+    exitcode = 0
+    mismatches = checkEdgeCases(workdir)
+    for sessions in args.sizes:
+        for preamble in formats:
+            label = "{0:d} sessions, {1:s} format".format(sessions, "old" if preamble else "new")
+            csvtarget = os.path.join(workdir, "participants_{0:d}_{1:s}.csv".format(sessions, "old" if preamble else "new"))
+            tic = time.perf_counter()
+            people = generateCsv(csvtarget, sessions, preamble, args.rejoin, args.overlap, args.seed)
+            toc = time.perf_counter()
+            zoompart.quiet = False
+            zoompart.report()
+            zoompart.report("generated", label, "{0:d} participants in {1:0.1f} s".format(people, toc - tic))
+            if args.genonly: continue
+            zoompart.quiet = True
+            results = benchFile(csvtarget, sessions, args.looplimit, args.inferlimit, mismatches)
+            zoompart.quiet = False
+            sayResults(label, results)
+
+    zoompart.report()
+    zoompart.report("engine checks", "disagree" if mismatches else "agree")
+    for mismatch in mismatches:
+        zoompart.report("engines differ", mismatch)
+    if mismatches: exitcode = 1
+
+    if not args.genonly:
+        startup = benchStartup()
+        zoompart.report()
+        zoompart.report("startup", "{0:10.4f} s".format(startup), "budget {0:0.3f} s".format(startupBudget))
+        if startup > startupBudget:
+            zoompart.report("startup", "over budget")
+            exitcode = 1
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        zoompart.report("peak RSS", "{0:0.1f} MiB".format(usage.ru_maxrss / 1024.0))   # kilobytes on Linux
+    zoompart.report()
+    sys.exit(exitcode)
+
+if __name__ == '__main__':
+    main()
+
+# end of file
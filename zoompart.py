@@ -43,11 +43,20 @@
 # hardcoded here only
 
 numberedTitleFmt = "dummy workshop {0:02d} participation"             # used to create indexed title under option '--numbered-title'
+fuzzyThreshold = 0.6                                                  # trigram similarity at or above which names are merged under option '--fuzzy-name'
+minutesTolerance = 1.0                                                # Zoom minutes this far or more from the leave less join are flagged as anomalies
 
 # hardcoded defaults here but can be overwritten by command-line options
 
 standinPlotTitle = "stand in title"                                   # used when no title is set on the command-line
 cutoffDefault = 20                                                    # durations below this threshold in minutes are excluded in some participant counts
+batchSummaryDefault = "zoompart-summary.dat"                          # batch mode summary table
+batchPattern = "participants_*.csv"                                   # batch mode search pattern within directories
+cacheDirDefault = "~/.cache/zoompart"                                 # results cache, relative to XDG_CACHE_HOME when set
+cacheLimitDefault = 64                                                # results cache size limit in megabytes
+watchPollDefault = 2.0                                                # watch mode polling interval in seconds
+watchSettle = 5.0                                                     # watch mode waits for files unchanged this many seconds
+serveTimeout = 600.0                                                  # client waits this many seconds for each server response
 
 # --------------------------------------
 #  version information
@@ -60,15 +69,27 @@ versionStr = "0.7"                                                    # script v
 # -------------------------------------
 
 import argparse                                   # argument parsing
+import collections                               # trigram frequencies
+import contextlib                                 # capture worker reporting
+import csv                                        # tokenize header lines
 import enum                                       # enumeration support
+import glob                                       # expand batch file patterns
+import io
+import json                                       # machine-readable profile output
+import math
 import os
 import re                                         # support for regular expressions
+import shutil                                     # terminal size without a subprocess
 import stat                                       # 'stat' (file status) results interpretation
 import sys
+import time                                       # stage timing
 
-import pandas
 import datetime                                   # calculate timedelta intervals
 
+# CAUTION: numpy, pandas, matplotlib, and the process pool are imported within
+# the functions that need them, so that usage errors, '--help', '--version',
+# and missing files are reported without that startup cost
+
 # -------------------------------------
 #  exit codes
 # -------------------------------------
@@ -79,8 +100,20 @@ class ExitCode(enum.Enum):
     usage    =   2                                # command-line usage issue (the same as the argparse default)
     noFile   =  50                                # regular file not found
     datIssue =  51                                # DAT file issue
+    batchIssue = 52                               # one or more files in a batch failed
+    storeIssue = 53                               # longitudinal store issue
+    serveIssue = 54                               # analysis server unreachable
+    partialIssue = 55                             # partial aggregates cannot be merged
+
+# -------------------------------------
+#  reporting state
+# -------------------------------------
+
+# set by the command-line interface, library users may set these directly
 
-exitCode = ExitCode.success.value                 # presume success
+verbose = False                                   # show additional information, see 'deport'
+showDataframes = False                            # print dataframes in 'sayDf'
+quiet = False                                     # suppress all reporting
 
 # -------------------------------------
 #  argument parsing
@@ -96,16 +129,19 @@ The utility plots duration information from the participant CSV file produced at
 the end of a Zoom session.
 
 Around May 2020 the CSV file no longer contained two lines of meeting data.
-The script tries to import that data in a try block and fails gracefully if
-it is absent.
+The script detects that data from the tokens on the first line, so that the
+file is opened and parsed only once in either case.
 
 Zoom is a proprietary video-conferencing application.  CSV indicates a
 comma-separated values file.
 
 The resulting plot window can be either saved automatically using the
 --save-plot option or saved manually as a SVG or PNG file from the plot
-window.  Automatic saving may not work on your system, in which case revert to
-saving by hand with your mouse.
+window.  Option --headless instead renders the plot without a display, on a
+non-interactive backend, straight to a file in the format set by
+--plot-format.  This is also the behavior when no display is found and always
+the case in batch and watch modes, where the plots are rendered in the worker
+processes.  The saved files are the same from run to run for the same data.
 
 A hardcoded custom numbered title is activated under option --numbered-title:
   "{0}"
@@ -120,6 +156,136 @@ durations.  Two options override this default behavior.  Option --dedup-name
 deduplicates on name and --ignore-gaps identifies the first join and the last
 leave timestamps and utilizes the simple difference instead.
 
+Names are not always typed the same way on rejoining.  Option --fuzzy-name
+deduplicates on names that are normalized (accents, case, and punctuation
+removed) and then merged when their trigram similarity reaches {4}.  Candidate
+pairs come from a trigram index, so large rosters remain tractable.
+
+Durations are calculated by grouping sessions on the deduplication key in a
+single pass.  With gaps considered, each session contributes only the time it
+extends beyond the leave of the previous session by the same participant, in
+order of joining, so overlapping sessions are not double counted.  Option
+--loop-engine selects the original row-by-row loops instead, which are much
+slower but retained as a reference implementation.
+
+More than one CSV file, a glob pattern, or a directory (which is searched for
+"participants_*.csv") selects batch mode.  The files are processed across a
+pool of worker processes, set by --jobs, and a DAT file named after each CSV
+file is written for every meeting.  Plots are saved as SVG files, without
+display, only under --save-plot.  A combined summary table is written to the
+file given by --summary.  A file that fails is recorded in the summary table
+and does not abort the batch.  Files of the same name in different directories
+or archive folders get outputs prefixed with those, as "a_participants_NNN".
+
+CSV files compressed with gzip, bzip2, or xz (".gz", ".bz2", or ".xz") are
+read directly, as are the members of a ZIP archive, which is expanded in batch
+mode or named member by member as "archive.zip::participants_NNN.csv".  A
+single "-" reads the CSV file from standard input.  Nothing is unpacked to
+disk, and the cache is keyed on the uncompressed content.
+
+Very large files can be streamed under option --chunk-size.  The CSV file is
+then read that many rows at a time and each chunk is folded into a running
+per-participant state: first join and last leave when ignoring gaps, otherwise
+a set of disjoint attendance intervals.  Memory use then scales with the
+number of participants rather than the number of sessions.  Option --truncate
+does not apply when streaming.  Durations from intervals are the union of the
+sessions, and are lower than the default only when a session nested inside an
+earlier one is followed by another overlapping that earlier one.
+
+Option --watch polls a directory for "participants_*.csv" files and processes
+each new or changed file as in batch mode, in one long-running process so that
+pandas is imported only once.  A file is taken up once its size and
+modification time have held for a few seconds, so files still being written
+are left alone, and a file whose content is unchanged is skipped.  Plots are
+saved rather than displayed unless --no-plot is given.  Interrupt to stop.
+
+Option --serve keeps a process listening on a Unix domain socket so that the
+costs of starting Python and importing pandas and matplotlib are paid once.
+Requests are JSON lines naming a CSV file plus the options above and each
+answer is one JSON line holding the summary, with outputs written as in batch
+mode into the client's directory.  Requests run concurrently in a pool of
+--jobs worker processes.  Option --connect is the matching client, sending each
+CSV file given with the other options and printing the answers.
+
+Each CSV file is checked for session rows leaving before joining, lacking the
+deduplication key, lacking or with unreadable join or leave times, or whose Zoom
+minutes differ from the leave less join by a minute or more.  Such rows are
+counted in the report, and all but the last kind are left out of the durations.
+Option --anomalies writes them to a CSV file with "-anomalies" appended to the
+stub, giving the session row number counting from one after the header, the
+flags, the times, and both durations.
+
+Option --partial-out writes the disjoint attendance intervals of each
+participant, keys hashed, as a JSON partial aggregate.  Shards of one export,
+or parallel breakout meetings, can then be processed on different machines and
+combined under --merge, which takes partial aggregate files in place of CSV
+files and gives the same durations as a streamed run over all the rows, that
+is the union of the sessions rather than the default durations when gaps are
+considered.  Merged results may be written out again, so partial aggregates
+reduce in any order.
+Shards must share the salt in the environment variable ZOOMPART_SALT, which
+is required.
+
+Option --export writes the stocked per-participant table (hashed key, first
+join, last leave, minutes, and session count) and the meeting data (with the
+host email hashed) as "<stub>-participants" and "<stub>-meeting" files in CSV,
+Parquet, or Arrow IPC format, the latter two needing pyarrow.  The hashes are
+salted with the environment variable ZOOMPART_SALT, when set, so that exports
+can be joined, else with a random salt.  Keys are hashed exactly as
+deduplicated, so each participant hash occurs once.
+
+Option --store adds the per-participant durations of each meeting to an
+SQLite file, which is created as required.  Meetings are identified by their
+Zoom meeting ID and start time, so recurring meetings are kept apart, and a
+file already stored is skipped.  Participants are held only as salted hashes
+of the deduplication key, which must then stay the same for that store.
+Option --query answers questions across the stored meetings without the CSV
+files: "series" tabulates each meeting, "returning" splits participants into
+those seen before and those new, and "engaged" counts participants staying
+--cutoff minutes or more in N of M meetings.  The CSV file may then be omitted.
+
+Option --csv-engine selects the pandas CSV parser: "c" (the default),
+"python", or "pyarrow", which is multithreaded and fastest on large files but
+needs the optional pyarrow package and falls back to "c" without it.  Only the
+columns used are loaded.  Timestamps are parsed with the known Zoom formats,
+falling back to slower inference for anything else.
+
+Results are cached so that repeated runs on the same CSV file, say with a
+different title or cutoff, skip reading and stocking.  Cache entries are keyed
+on the file content, the deduplication key, and the gap treatment.  The cache
+directory defaults to "{3}" and the least recently used entries are removed
+once it exceeds --cache-limit megabytes.  Option --no-cache bypasses the cache,
+as do --truncate and --loop-engine.
+
+Option --timeline counts the participants connected at the start of each
+minute and reports the peak and its time.  Overlapping sessions by the same
+participant count once.  The counts are written to a DAT file with "-timeline"
+appended to the stub, one line per minute giving the minute offset and count.
+
+Option --profile records the wall time, CPU time, row count, and peak resident
+set size of each pipeline stage: file check, cache, meta read, CSV parse,
+validation, deduplication, stocking, interval merge, column extraction, DAT
+writing, timeline, and plotting.  One JSON line per CSV file is appended to the given
+file, or written to standard output for "-".
+
+Option --window counts the participants present within a window of meeting
+minutes, given as a Python slice from the minute of the first join, so "0:15"
+is the first quarter hour and "--window=-15:" the last, the "=" being needed
+for a leading minus.  When repeated, those present in every window are also counted.  Option
+--window-all requires presence throughout a window rather than at any time.
+The windows are answered from a bit-packed participant by minute presence
+matrix, which option --presence saves as a heatmap with "-presence" appended to
+the stub, persons ordered as in the bar graph.
+
+Option --retention counts the participants staying for at least each of several
+cutoffs in one pass, giving a retention curve.  Cutoffs are comma-separated
+minutes or inclusive ranges with an optional step, say "5,10,20" or "0-60/5",
+and a trailing "%" makes them percentages of the nominal duration, or of the
+longest duration when --nominal-duration is not given.  The curve is reported
+and written to a DAT file with "-retention" appended to the stub, one line per
+cutoff giving the minutes and count.  Option --retention-plot overplots the
+curve on the bar graph.
+
 The short sessions cutoff under option --cutoff excludes sessions shorter than
 the given threshold when calculating the engaged participant count.  The default
 value is {2} minutes.
@@ -133,7 +299,7 @@ https://github.com/robbiemorrison/zoomcsv
 This script is open licensed under an ISC software license.  See code for
 details.
 
-""".format(numberedTitleFmt, standinPlotTitle, cutoffDefault)
+""".format(numberedTitleFmt, standinPlotTitle, cutoffDefault, cacheDirDefault, fuzzyThreshold)
 
 def argIsNatural(value):
     intvalue = int(value)
@@ -141,44 +307,53 @@ def argIsNatural(value):
         raise argparse.ArgumentTypeError("%s is not a non-negative integer" % value)
     return intvalue
 
-parser = argparse.ArgumentParser(description=description, epilog=epilog, formatter_class=argparse.RawDescriptionHelpFormatter)
-
-parser.add_argument('-V', '--version',                             action='version',                    version='%(prog)s ' + ' : ' + versionStr)
-parser.add_argument('-t', '--title',            dest="title",      action='store',      required=False,                    help='specify plot title')
-parser.add_argument('-n', '--numbered-title',   dest="number",     action='store',      required=False, type=argIsNatural, help='use custom numbered plot title')
-parser.add_argument('-l', '--nominal-duration', dest="duration",   action='store',      required=False, type=argIsNatural, help='set nominal meeting duration in minutes')
-parser.add_argument('-c', '--cutoff',           dest="cutoff",     action='store',      required=False, type=argIsNatural, help='set short session threshold in minutes')
-parser.add_argument('-I', '--ignore-gaps',      dest="ignoregaps", action='store_true', required=False,                    help='consider only beginning and closing timestamps')
-parser.add_argument('-N', '--dedup-name',       dest="usename",    action='store_true', required=False,                    help='deduplicate on name not email address')
-parser.add_argument('-d', '--dat-file',         dest="dat",        action='store_true', required=False,                    help='create or overwrite existing DAT file')
-parser.add_argument('-P', '--no-plot',          dest="noplot",     action='store_true', required=False,                    help='omit plot')
-parser.add_argument('-S', '--save-plot',        dest="saveplot",   action='store_true', required=False,                    help='save plot automatically (system dependent)')
-parser.add_argument('-T', '--truncate',         dest="length",     action='store',      required=False, type=argIsNatural, help='truncate input data for testing purposes')
-parser.add_argument('-v', '--verbose',          dest="verbose",    action='store_true', required=False,                    help='show additional information')
-parser.add_argument('-D', '--show-df',          dest="showdf",     action='store_true', required=False,                    help='show loaded dataframes')
-parser.add_argument('csv',                      type=str,          action="store",                                         help='participant CSV file from Zoom')
-
-args = parser.parse_args()
-
-# misuse of options
-
-if args.title and args.number:
-    raise argparse.ArgumentTypeError("cannot use options --title and --numbered-title simultaneously")
-if args.noplot and args.saveplot:
-    raise argparse.ArgumentTypeError("cannot use options --no-plot and --save-plot simultaneously")
-
-# for convenience
-
-plotTitle = args.title
-titleNumber = args.number
-nominalDuration = args.duration
-givenCutoff = args.cutoff
-useName = args.usename
-createDatFile = args.dat
-omitPlot = args.noplot
-savePlotAlso = args.saveplot
-csvTarget = args.csv
-ignoreGaps = args.ignoregaps
+def makeParser():                                 # create command-line parser and return same
+    parser = argparse.ArgumentParser(description=description, epilog=epilog, formatter_class=argparse.RawDescriptionHelpFormatter)
+
+    parser.add_argument('-V', '--version',                             action='version',                    version='%(prog)s ' + ' : ' + versionStr)
+    parser.add_argument('-t', '--title',            dest="title",      action='store',      required=False,                    help='specify plot title')
+    parser.add_argument('-n', '--numbered-title',   dest="number",     action='store',      required=False, type=argIsNatural, help='use custom numbered plot title')
+    parser.add_argument('-l', '--nominal-duration', dest="duration",   action='store',      required=False, type=argIsNatural, help='set nominal meeting duration in minutes')
+    parser.add_argument('-c', '--cutoff',           dest="cutoff",     action='store',      required=False, type=argIsNatural, help='set short session threshold in minutes')
+    parser.add_argument('-I', '--ignore-gaps',      dest="ignoregaps", action='store_true', required=False,                    help='consider only beginning and closing timestamps')
+    parser.add_argument('-N', '--dedup-name',       dest="usename",    action='store_true', required=False,                    help='deduplicate on name not email address')
+    parser.add_argument('-F', '--fuzzy-name',       dest="fuzzyname",  action='store_true', required=False,                    help='deduplicate on fuzzily matched names')
+    parser.add_argument('-L', '--loop-engine',      dest="loopengine", action='store_true', required=False,                    help='use slow row-by-row reference stocking loops')
+    parser.add_argument('-W', '--timeline',         dest="timeline",   action='store_true', required=False,                    help='report peak concurrency and write per-minute DAT file')
+    parser.add_argument('-r', '--retention',        dest="retention",  action='store',      required=False, type=argCutoffs,   help='report participants staying at each cutoff and write DAT file, such as 0-60/5')
+    parser.add_argument('-G', '--retention-plot',   dest="overlay",    action='store_true', required=False,                    help='overplot retention curve on bar graph')
+    parser.add_argument('-a', '--anomalies',        dest="anomalies",  action='store_true', required=False,                    help='write flagged session rows to CSV file')
+    parser.add_argument('-Y', '--presence',         dest="presence",   action='store_true', required=False,                    help='save participant by minute presence heatmap')
+    parser.add_argument('-x', '--window',           dest="window",     action='append',     type=argWindow,                    help='count participants present within this minute window, such as 0:15 or -15:, may be repeated')
+    parser.add_argument('-A', '--window-all',       dest="windowall",  action='store_true', required=False,                    help='require presence throughout each window')
+    parser.add_argument('-d', '--dat-file',         dest="dat",        action='store_true', required=False,                    help='create or overwrite existing DAT file')
+    parser.add_argument('-P', '--no-plot',          dest="noplot",     action='store_true', required=False,                    help='omit plot')
+    parser.add_argument('-S', '--save-plot',        dest="saveplot",   action='store_true', required=False,                    help='save plot automatically')
+    parser.add_argument('-H', '--headless',         dest="headless",   action='store_true', required=False,                    help='save plot without displaying it')
+    parser.add_argument('-O', '--plot-format',      dest="plotformat", action='store',      default='svg', choices=plotFormats, help='set saved plot file format (default svg)')
+    parser.add_argument('-j', '--jobs',             dest="jobs",       action='store',      required=False, type=argIsNatural, help='set batch worker process count')
+    parser.add_argument('-s', '--summary',          dest="summary",    action='store',      required=False,                    help='set batch summary filename (default {0:s})'.format(batchSummaryDefault))
+    parser.add_argument('-E', '--csv-engine',       dest="engine",     action='store',      default='c', choices=csvEngines,   help='select CSV parser (default c)')
+    parser.add_argument('-k', '--chunk-size',       dest="chunksize",  action='store',      required=False, type=argIsNatural, help='stream input data in chunks of this many rows')
+    parser.add_argument('-C', '--no-cache',         dest="nocache",    action='store_true', required=False,                    help='bypass results cache')
+    parser.add_argument('-K', '--cache-dir',        dest="cachedir",   action='store',      required=False,                    help='set results cache directory (default {0:s})'.format(cacheDirDefault))
+    parser.add_argument('-M', '--cache-limit',      dest="cachelimit", action='store',      required=False, type=argIsNatural, help='set results cache size limit in megabytes (default {0:d})'.format(cacheLimitDefault))
+    parser.add_argument('-w', '--watch',            dest="watch",      action='store',      required=False,                    help='process participant CSV files as they arrive in this directory')
+    parser.add_argument('-y', '--poll',             dest="poll",       action='store',      required=False, type=float,        help='set watch polling interval in seconds (default {0:0.1f})'.format(watchPollDefault))
+    parser.add_argument('-X', '--export',           dest="export",     action='append',     choices=exportFormats,             help='export per-participant and meeting tables, may be repeated')
+    parser.add_argument('-U', '--serve',            dest="serve",      action='store',      required=False,                    help='serve analysis requests on this Unix domain socket')
+    parser.add_argument('-u', '--connect',          dest="connect",    action='store',      required=False,                    help='send CSV files to the server on this Unix domain socket')
+    parser.add_argument('-o', '--partial-out',      dest="partialout", action='store',      required=False,                    help='write mergeable per-participant intervals to this JSON file')
+    parser.add_argument('-m', '--merge',            dest="merge",      action='store_true', required=False,                    help='merge partial aggregate files given instead of CSV files')
+    parser.add_argument('-B', '--store',            dest="store",      action='store',      required=False,                    help='add stocked results to this SQLite file, skipping files already held')
+    parser.add_argument('-Q', '--query',            dest="query",      action='append',     choices=storeQueries,              help='query the store across meetings, may be repeated')
+    parser.add_argument('-p', '--profile',          dest="profile",    action='store',      required=False,                    help='append per-stage timings as JSON lines to file, - for standard output')
+    parser.add_argument('-T', '--truncate',         dest="length",     action='store',      required=False, type=argIsNatural, help='truncate input data for testing purposes')
+    parser.add_argument('-v', '--verbose',          dest="verbose",    action='store_true', required=False,                    help='show additional information')
+    parser.add_argument('-D', '--show-df',          dest="showdf",     action='store_true', required=False,                    help='show loaded dataframes')
+    parser.add_argument('csv',                      type=str,          action="store",      nargs='*',                         help='participant CSV file from Zoom, or several files, glob patterns, directories, and ZIP archives, or - for standard input')
+
+    return parser
 
 # -------------------------------------
 #  report()
@@ -199,10 +374,11 @@ def report(funcname='', key='', value=''):
     elif key:      msg = '{0:<22s} : {1:s}'.format(funcname, key)
     elif funcname: msg = '{0:s}'.format(funcname)
     else:          msg = ''                       # effectively insert a blank line
+    if quiet: return
     print(msg)
 
 def deport(funcname='', key='', value=''):        # wrapper to 'report'
-    if args.verbose:
+    if verbose:
         report(funcname, key, value)
 
 # --------------------------------------
@@ -218,10 +394,11 @@ def scriptVer():                                  # print script version
     report(script + " version", versionStr)
 
 def setPandasWide():                              # allow full terminal output
-    termrows, termcols = os.popen('stty size', 'r').read().split()
+    import pandas
+    termcols, termrows = shutil.get_terminal_size()                   # falls back to 80 x 24 without a terminal
     termheight = int(termrows)
     termwidth = int(termcols)
-    deport("stty rows x cols", '{0:d} x {1:d}'.format(termheight, termwidth))
+    deport("terminal rows x cols", '{0:d} x {1:d}'.format(termheight, termwidth))
     pandas.set_option('display.width', termwidth) # default width is 80
     pandaswidth = pandas.get_option('display.width')
     deport("pandas reporting width", pandaswidth)
@@ -234,7 +411,7 @@ def sayDf(df, stub, rows=5):                      # short report on given datafr
     colstr = "| " + ' | '.join(cols) + " |"
     report()
     report(colstr)
-    if not args.showdf:
+    if not showDataframes or quiet:
         return
     print()
     if rows == 0: print(df)
@@ -243,21 +420,207 @@ def sayDf(df, stub, rows=5):                      # short report on given datafr
 def checkFile(regular):                           # check 'regular' that is a regular file with at least read permissions
     return os.path.isfile(regular) and os.access(regular, os.R_OK)
 
+def checkTarget(target):                          # check 'target' is standard input, a readable zip archive member, or a readable file
+    if target == stdinTarget: return True
+    archive, member = splitTarget(target)
+    if member is None: return checkFile(archive)
+    import zipfile
+    if not checkFile(archive) or not zipfile.is_zipfile(archive): return False
+    with zipfile.ZipFile(archive) as bundle:
+        return member in bundle.namelist()
+
+# input targets, besides plain files
+#   "-"                          standard input, read once and never cached
+#   every target is hashed while read by 'openCsv', see 'drainHash'
+#   "participants_1.csv.gz"      gzip, also ".bz2" and ".xz", decompressed while read
+#   "bundle.zip::participants_1.csv"  zip archive member, read without extraction
+
+stdinTarget = "-"
+memberSep = "::"
+compressedSuffixes = ['.gz', '.bz2', '.xz']
+stdinOpened = False                               # set once standard input is opened
+
+class HashingReader(io.RawIOBase):                # pass bytes through while feeding a SHA-256 object
+    def __init__(self, raw):
+        import hashlib
+        self.raw = raw
+        self.sha = hashlib.sha256()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self.raw.readinto(buffer)
+        if count: self.sha.update(memoryview(buffer)[:count])
+        return count
+
+    def close(self):
+        if not self.closed: self.raw.close()
+        super().close()
+
+def splitTarget(target):                          # return the archive and member of a zip member target, else the target and 'None'
+    archive, sep, member = target.partition(memberSep)
+    if sep and archive.lower().endswith('.zip'): return archive, member
+    return target, None
+
+def targetStub(target):                           # return file name stub of 'target' without directories, member path, or suffixes
+    if target == stdinTarget: return "stdin"
+    archive, member = splitTarget(target)
+    name = os.path.basename(member or archive)
+    for suffix in compressedSuffixes:
+        if name.endswith(suffix): name = name[:-len(suffix)]
+    return os.path.splitext(name)[0]
+
+def targetParts(target):                          # return path components of 'target' ending with its stub, the member path following the archive
+    archive, member = splitTarget(target)
+    parts = [part for part in os.path.abspath(archive).split(os.sep) if part]
+    if member is not None:
+        parts[-1] = os.path.splitext(parts[-1])[0]                    # archive less '.zip'
+        parts += [part for part in member.split('/') if part]
+    parts[-1] = targetStub(target)
+    return parts
+
+def batchStubs(targets):                          # return distinct output stubs for 'targets', else 'None'
+    """return output stubs for 'targets' in order, else 'None' when two cannot be told apart
+
+    * a stub shared by several targets is widened with parent directories or member path components, joined by '_'
+    * the same target twice, or a file next to its compressed copy, cannot be told apart
+    """
+
+    stubs = [targetStub(target) for target in targets]
+    depth = 1
+    while True:
+        counts = collections.Counter(stubs)
+        clashes = [index for index, stub in enumerate(stubs) if counts[stub] > 1]
+        if not clashes: return stubs
+        depth += 1
+        widened = False
+        for index in clashes:
+            parts = targetParts(targets[index])
+            if len(parts) >= depth:
+                stubs[index] = '_'.join(parts[-depth:])
+                widened = True
+        if not widened: return None
+
+def openBinary(target):                           # open 'target' for a single pass over its bytes, decompressing as required
+    global stdinOpened
+    if target == stdinTarget:
+        if stdinOpened:
+            raise IOError("standard input already read")
+        stdinOpened = True
+        return sys.stdin.buffer
+    archive, member = splitTarget(target)
+    if member is not None:
+        import zipfile
+        with zipfile.ZipFile(archive) as bundle:
+            return bundle.open(member)            # CAUTION: the archive file stays open until the member stream is closed
+    if target.endswith('.gz'):
+        import gzip
+        return gzip.open(target, 'rb')
+    if target.endswith('.bz2'):
+        import bz2
+        return bz2.open(target, 'rb')
+    if target.endswith('.xz'):
+        import lzma
+        return lzma.open(target, 'rb')
+    return open(target, 'rb')
+
+def zipMembers(archive):                          # return the participant CSV members of a zip archive as targets
+    import fnmatch
+    import zipfile
+    with zipfile.ZipFile(archive) as bundle:
+        names = [info.filename for info in bundle.infolist()
+                 if not info.is_dir() and fnmatch.fnmatch(info.filename.rsplit('/', 1)[-1], batchPattern)]
+    return [archive + memberSep + name for name in sorted(names)]
+
+def batchFiles(directory):                        # return participant CSV files in 'directory', compressed or not
+    paths = []
+    for suffix in [''] + compressedSuffixes:
+        paths.extend(glob.glob(os.path.join(directory, batchPattern + suffix)))
+    return sorted(paths)
+
 # read in CSV file meeting data
 # Meeting ID | Topic | Start Time | End Time | User Email | Duration (Minutes) | Participants | Unnamed: 7
 
-def readMeta(csvtarget):                          # read CSV metadata
-    grab = 1
-    df = pandas.read_csv(csvtarget, nrows=grab, parse_dates=['Start Time', 'End Time'])
-    newcols = { 'Meeting ID'         : 'MeetingID',
-                'Topic'              : 'Topic',
-                'Start Time'         : 'Start',
-                'End Time'           : 'Close',
-                "User Email"         : "HostEmail",
-                'Duration (Minutes)' : 'Minutes',
-                'Participants'       : 'Count'}
-    df = df.rename(columns=newcols)
-    return df
+metaCols = { 'Meeting ID'         : 'MeetingID',
+             'Topic'              : 'Topic',
+             'Start Time'         : 'Start',
+             'End Time'           : 'Close',
+             "User Email"         : "HostEmail",
+             'Duration (Minutes)' : 'Minutes',
+             'Participants'       : 'Count'}
+
+timeFormats = [ '%m/%d/%Y %I:%M:%S %p',         # Zoom export, e.g. 03/26/2020 02:23:34 PM
+                '%m/%d/%Y %H:%M:%S',            # 24-hour clock
+                '%Y-%m-%d %H:%M:%S' ]           # ISO 8601
+
+csvEngines = ['c', 'python', 'pyarrow']           # pandas CSV parsers, 'pyarrow' is optional
+
+def parseTimes(series):                           # parse a column of timestamps with the known formats and return a datetime series
+    import pandas
+    if pandas.api.types.is_datetime64_any_dtype(series):
+        return series                             # already parsed by the engine
+    for fmt in timeFormats:
+        try:
+            return pandas.to_datetime(series, format=fmt)
+        except (ValueError, TypeError):
+            pass                                  # try the next format
+    best = None                                   # unreadable entries become missing, flagged by 'validateSessions'
+    for fmt in timeFormats:
+        parsed = pandas.to_datetime(series, format=fmt, errors='coerce')
+        if parsed.notna().any() and (best is None or parsed.notna().sum() > best.notna().sum()):
+            best = parsed
+    if best is not None:
+        deport("timestamp format", "some entries unreadable")
+        return best
+    deport("timestamp format", "not recognized, inferring element by element")
+    return pandas.to_datetime(series, errors='coerce')  # slow fallback
+
+def csvEngine(engine):                            # return a usable CSV engine, 'c' when 'pyarrow' is not installed
+    import importlib.util
+    if engine == 'pyarrow' and importlib.util.find_spec('pyarrow') is None:
+        report("CSV engine", "pyarrow not installed, using c")
+        return 'c'
+    return engine
+
+def openCsv(csvtarget):                           # open 'csvtarget' for a single pass, the 'utf-8-sig' codec discards any byte order mark
+    return io.TextIOWrapper(io.BufferedReader(HashingReader(openBinary(csvtarget)), 1 << 16), encoding='utf-8-sig', newline='')
+
+def drainHash(fd):                                # read what is left of open CSV file 'fd' and return the SHA-256 hex digest of its content
+    for block in iter(lambda: fd.buffer.read(1 << 20), b''):
+        pass                                      # the parsers normally leave nothing
+    return fd.buffer.raw.sha.hexdigest()
+
+def readLine(fd):                                 # read the next line of open file 'fd' from its byte buffer, so that the text layer holds no read-ahead
+    return fd.buffer.readline().decode('utf-8-sig')  # any byte order mark leads the first line
+
+def readTokens(fd):                               # read the next nonblank line from open file 'fd' and return same and its tokens
+    line = readLine(fd)
+    while line and not line.strip():              # skip blank separator lines
+        line = readLine(fd)
+    tokens = next(csv.reader([line]), [])
+    tokens = [token or 'Unnamed: {0:d}'.format(i) for i, token in enumerate(tokens)]  # as per pandas
+    return line, tokens
+
+def readMeta(fd):                                 # read CSV metadata and session header from open file 'fd'
+    """sniff the optional two-line meeting preamble
+
+    * returns the meta dataframe (or 'None' if absent) and the session column names
+    * 'fd' is left positioned at the first session row
+    """
+
+    import pandas
+
+    line, tokens = readTokens(fd)
+    if not 'Meeting ID' in tokens:                # newer format, this is the session header
+        return None, tokens
+    text = line + readLine(fd)                    # header and single data line
+    df = pandas.read_csv(io.StringIO(text))
+    df = df.rename(columns=metaCols)
+    for col in ['Start', 'Close']:
+        if col in df: df[col] = parseTimes(df[col])
+    line, tokens = readTokens(fd)                 # session header
+    return df, tokens
 
 def sayMeta(df):
     mid = df.at[0, 'MeetingID']
@@ -279,19 +642,57 @@ def sayMeta(df):
 # CSV columns : | Name (Original Name) | User Email | Join Time | Leave Time | Duration (Minutes) | Attentiveness Score |
 # date parsing example: 03/26/2020 02:23:34 PM -> 2020-03-26 14:23:34
 
-def readCsv(csvtarget, csvskip=0):                # read 'csvtarget' into a dataframe and return same
-    df = pandas.read_csv(csvtarget,
-                         header=csvskip,
-                         parse_dates=['Join Time', 'Leave Time'])
-    newcols = { 'Name (Original Name)' : 'Name',
+sessionCols = { 'Name (Original Name)' : 'Name',
                 'User Email'           : 'Email',
                 'Join Time'            : 'Join',
                 'Leave Time'           : 'Leaf',  # usefully 4 chars like "Join"
                 'Duration (Minutes)'   : 'Minutes',
                 'Attentiveness Score'  : 'Score'}
-    df = df.rename(columns=newcols)
+
+categoryCols = ['Name (Original Name)', 'User Email']  # participant keys, repeated across sessions
+
+usedCols = ['Name (Original Name)', 'User Email', 'Join Time', 'Leave Time', 'Duration (Minutes)']  # columns the pipeline uses
+
+def checkTimeCols(names):                         # raise unless both session time columns are present
+    missing = [col for col in ['Join Time', 'Leave Time'] if col not in names]
+    if missing:
+        raise ValueError("missing session columns: " + ", ".join(missing))
+
+def readCsv(fd, names, engine='c'):               # read session rows from open file 'fd' into a dataframe and return same
+    import pandas
+    checkTimeCols(names)
+    engine = csvEngine(engine)
+    if engine == 'pyarrow':                       # pyarrow decodes itself, hand it the remaining bytes
+        fd = fd.buffer
+    df = pandas.read_csv(fd,
+                         header=None,
+                         names=names,             # header already consumed by 'readMeta'
+                         usecols=[names.index(col) for col in usedCols if col in names],  # CAUTION: positions, pyarrow mishandles names here
+                         dtype={col: 'category' for col in categoryCols if col in names},  # one code per session rather than one string
+                         engine=engine)
+    df = df.rename(columns=sessionCols)
+    df['Join'] = parseTimes(df['Join'])
+    df['Leaf'] = parseTimes(df['Leaf'])
+    if 'Minutes' in df:
+        df['Minutes'] = pandas.to_numeric(df['Minutes'], downcast='integer')
     return df
 
+def expandTargets(patterns):                      # expand files, glob patterns, directories, and zip archives into a list of CSV targets
+    targets = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths = batchFiles(pattern)
+        elif glob.has_magic(pattern) and splitTarget(pattern)[1] is None:
+            paths = sorted(glob.glob(pattern))
+        else:
+            paths = [pattern]                     # may not exist, reported later
+        for path in paths:
+            if path.lower().endswith('.zip') and checkFile(path):
+                targets.extend(zipMembers(path))  # members, never extracted
+            else:
+                targets.append(path)
+    return targets
+
 def truncateDf(df, rowslice):
     deport()
     deport("truncation active")
@@ -300,27 +701,144 @@ def truncateDf(df, rowslice):
     df = df[:rowslice]
     return df
 
+# fuzzy identity resolution under option '--fuzzy-name'
+# names are normalized, candidate pairs are drawn from a trigram index rather than all pairs, and similar names are merged
+
+def normalizeName(name):                          # return lowercase name stripped of accents, punctuation, and extra spaces
+    import unicodedata
+    name = unicodedata.normalize('NFKD', str(name))
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    name = re.sub(r'[^\w\s]|_', ' ', name.lower())
+    return ' '.join(name.split())
+
+def nameTrigrams(name):                           # return set of trigrams of a normalized name, padded to mark word ends
+    padded = '  ' + name + ' '
+    return { padded[i:i+3] for i in range(len(padded) - 2) }
+
+def clusterNames(names, threshold):               # return cluster representative for each of 'names'
+    """cluster near-duplicate names
+
+    * identical normalized names are merged outright
+    * otherwise names are merged when the Jaccard similarity of their trigram sets reaches 'threshold'
+    * only names sharing one of their rarest trigrams are compared, which is sufficient by the prefix filtering argument:
+      similar sets share at least 'threshold' of their trigrams and so must share one of any larger remainder
+    * clusters are formed by union-find, so similarity is transitive
+    * each cluster is represented by its lexically first original name
+    """
+
+    normals = [normalizeName(name) for name in names]
+    forms = sorted(set(normals))                  # distinct normalized names
+    formindex = { form : i for i, form in enumerate(forms) }
+    grams = [nameTrigrams(form) for form in forms]
+    frequency = collections.Counter(gram for gramset in grams for gram in gramset)
+    prefixes = []                                 # rarest trigrams of each normalized name
+    for gramset in grams:
+        ordered = sorted(gramset, key=lambda gram: (frequency[gram], gram))
+        overlap = math.ceil(threshold * len(ordered) - 1e-9)          # fewest trigrams a similar name shares
+        prefixes.append(ordered[:len(ordered) - overlap + 1])
+    postings = {}                                 # prefix trigram to normalized names
+    for i, prefix in enumerate(prefixes):
+        for gram in prefix:
+            postings.setdefault(gram, []).append(i)
+    parents = list(range(len(forms)))
+    def find(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]      # path halving
+            i = parents[i]
+        return i
+    comparisons = 0
+    for i, gramset in enumerate(grams):
+        candidates = set()
+        for gram in prefixes[i]:
+            candidates.update(postings[gram])
+        low = threshold * len(gramset)            # similar names have comparable trigram counts
+        high = len(gramset) / threshold
+        for j in candidates:
+            if j <= i: continue                   # each pair once
+            if not low <= len(grams[j]) <= high: continue
+            if find(i) == find(j): continue
+            comparisons += 1
+            shared = len(gramset & grams[j])
+            if shared / (len(gramset) + len(grams[j]) - shared) >= threshold:
+                parents[find(j)] = find(i)
+    deport("fuzzy comparisons", comparisons)
+    representatives = {}                          # root to lexically first original name
+    for name, normal in zip(names, normals):
+        root = find(formindex[normal])
+        if root not in representatives or name < representatives[root]:
+            representatives[root] = name
+    return [representatives[find(formindex[normal])] for normal in normals]
+
+def resolveIdentities(names, threshold=None):     # return categorical series of merged identities aligned with 'names'
+    import numpy
+    import pandas
+    if threshold is None: threshold = fuzzyThreshold
+    codes, uniques = pandas.factorize(names)      # cluster distinct names only
+    uniques = [str(name) for name in uniques]
+    labels = numpy.asarray(clusterNames(uniques, threshold) + [None], dtype=object)  # CAUTION: missing names have code -1, mapped to the trailing 'None'
+    identities = pandas.Series(labels[codes], index=names.index, dtype='category')
+    report()
+    report("distinct names", len(uniques))
+    report("merged identities", identities.nunique())
+    return identities
+
 def createSecondDf(df, mainkey):                  # create recipient dataframe and return same
-    df2 = df.copy()
-    df2 = df2[[mainkey]]                          # slice dataframe using 'mainkey'
+    import numpy
+    import pandas
+    df2 = df[[mainkey]]                           # slice dataframe using 'mainkey'
     df2 = df2.drop_duplicates(keep='first')       # remove duplicate rows
+    df2 = df2.dropna()                            # sessions without a key are flagged by 'validateSessions' and not stocked
+    df2 = df2.astype(object)                      # one row per participant, plain keys map cleanly
     df2 = df2.sort_values(by=[mainkey])           # sort
     df2 = df2.reset_index(drop=True)              # CAUTION: reindex essential, 'drop' means do not try to insert new index into a dataframe column
-    df2['Join'] = None                            # add new column and initialize to nothing
-    df2['Leaf'] = None                            # add new column and initialize to nothing
-    df2['Delta'] = 0                              # add new column and initialize to integer zero
+    df2['Join'] = pandas.NaT                      # add new datetime column and initialize to nothing
+    df2['Leaf'] = pandas.NaT                      # add new datetime column and initialize to nothing
+    df2['Delta'] = pandas.Series(0.0, index=df2.index, dtype='float64')  # float zero, float32 would not resolve seconds beyond 512 minutes
+    codes, uniques, joins, leafs = sessionArrays(df, mainkey)
+    sessions = stockByCode(df2, mainkey, uniques, numpy.bincount(codes, minlength=len(uniques)))
+    df2['Sessions'] = sessions.astype('int64')                        # session count
     return df2
 
+# plain array view of the original dataframe, the engines below work on these
+
+def epochSeconds(series):                                             # return datetime series as int64 seconds since epoch
+    return series.to_numpy(dtype='datetime64[s]').astype('int64')     # Zoom times are whole seconds
+
+def fromEpochSeconds(seconds):                                        # return int64 seconds since epoch as datetimes
+    import pandas
+    return pandas.to_datetime(seconds, unit='s')
+
+def sessionArrays(df, mainkey):                                       # return participant codes, participant keys, and join and leave seconds
+    import numpy
+    import pandas
+    codes, uniques = pandas.factorize(df[mainkey])                    # integer code per participant, categorical keys reuse their codes
+    uniques = numpy.asarray(uniques, dtype=object)                    # code to key
+    joins = epochSeconds(df['Join'])
+    leafs = epochSeconds(df['Leaf'])
+    keep = codes >= 0                                                 # CAUTION: missing keys have code -1
+    if not keep.all():
+        codes, joins, leafs = codes[keep], joins[keep], leafs[keep]
+    return codes, uniques, joins, leafs
+
+def stockByCode(df2, mainkey, uniques, values):                       # return per-code values aligned with recipient dataframe
+    import pandas
+    values = pandas.Series(values, index=uniques)
+    if df2.empty:                                                     # CAUTION: mapping onto nothing fails for datetimes, keep the dtype
+        return pandas.Series(values.to_numpy()[:0], index=df2.index)
+    return df2[mainkey].map(values)
+
 # loop original dataframe and ratchet up cumulative minutes in recipient dataframe
-# iterating over dataframes is not good practice but it will do for now
+# iterating over dataframes is not good practice, these loops are retained as reference implementations under option '--loop-engine'
 
-def stockSecondDfIgnoreGaps(df, df2, mainkey):                        # load recipient dataframe and return same
+def stockSecondDfIgnoreGapsLoop(df, df2, mainkey):                    # reference implementation, load recipient dataframe and return same
+    import pandas
     # stocking code
     deport()
     deport("stocking loop")
     for index, row in df.iterrows():
         # get original data
         value = row[mainkey]
+        if pandas.isnull(value): continue                             # missing key, as for the grouped engines
         join = row['Join']
         leaf = row['Leaf']
         # get, process, and set recipient data
@@ -329,11 +847,11 @@ def stockSecondDfIgnoreGaps(df, df2, mainkey):                        # load rec
         colindex2leaf = df2.columns.get_loc('Leaf')
         currentjoin = df2.iat[rowindex2, colindex2join]               # get current join time
         currentleaf = df2.iat[rowindex2, colindex2leaf]               # get current leaf time
-        if currentjoin == None:
+        if pandas.isnull(currentjoin):
             df2.iat[rowindex2, colindex2join] = join                  # set new join time
         elif join < currentjoin:
             df2.iat[rowindex2, colindex2join] = join                  # ratchet down join time
-        if currentleaf == None:
+        if pandas.isnull(currentleaf):
             df2.iat[rowindex2, colindex2leaf] = leaf                  # set new leaf time
         elif leaf > currentleaf:
             df2.iat[rowindex2, colindex2leaf] = leaf                  # ratchet up leaf time
@@ -346,19 +864,20 @@ def stockSecondDfIgnoreGaps(df, df2, mainkey):                        # load rec
         duration = leaf2 - join2                                      # datetime.timedelta object
         minutes = duration.total_seconds() / 60.0                     # floating point-valued
         colindex2delta = df2.columns.get_loc('Delta')                 # returns zero-based index
-        df2.iat[index2, colindex2delta] = minutes                     # integer-valued
+        df2.iat[index2, colindex2delta] = minutes                     # stored as float64
 
     df2 = df2.sort_values(by=['Delta'])                               # sort
     return df2
 
-def stockSecondDfConsiderGaps(df, df2, mainkey):                      # load recipient dataframe and return same
-    # column names:  df  : | Email | Join | Leaf | Minutes |          # minutes from original Zoom data
+def stockSecondDfConsiderGapsLoop(df, df2, mainkey):                  # reference implementation, load recipient dataframe and return same
+    import pandas
+    # column names:  df  : | Email | Join | Leaf |
     # column names : df2 : | Email | Join | Leaf | Delta |
     # stocking code
     deport()
     deport("stocking loop")
     # prepare df
-    df3 = df.sort_values(by=['Join'])                                 # CAUTION: sort is essential
+    df3 = df.sort_values(by=['Join', 'Leaf'], kind='stable')          # CAUTION: sort is essential, same join sorts on leave as for the grouped engine
     # prepare df2
     epochstart = pandas.to_datetime(0, unit='s').tz_localize('UTC')   # 1970-01-01 00:00:00+00:00
     epochstart = pandas.to_datetime(0, unit='s')                      # 1970-01-01 CAUTION: TZ-naive necessary for later comparisons
@@ -367,14 +886,14 @@ def stockSecondDfConsiderGaps(df, df2, mainkey):                      # load rec
     df2['Playhead'] = epochstart                                      # df2 now with column name | Playhead |
     colindex2join = df2.columns.get_loc('Join')                       # returns zero-based index
     colindex2leaf = df2.columns.get_loc('Leaf')                       # leave time
-    colindex2delt = df2.columns.get_loc('Delta')                      # class 'numpy.int64'
+    colindex2delt = df2.columns.get_loc('Delta')                      # class 'numpy.float64'
     colindex2head = df2.columns.get_loc('Playhead')
     for index, row in df3.iterrows():                                  # not deduplicated
         # get original data
         value = row[mainkey]
+        if pandas.isnull(value): continue                             # missing key, as for the grouped engines
         join = row['Join']
         leaf = row['Leaf']
-        zoommins = row['Minutes']
         # get current recipient data
         rowindex2 = df2.index[df2[mainkey] == value].tolist()[0]      # list never more than one item
         currenthead = df2.iat[rowindex2, colindex2head]               # get current playhead
@@ -386,38 +905,422 @@ def stockSecondDfConsiderGaps(df, df2, mainkey):                      # load rec
         minutes = duration.total_seconds() / 60.0                     # class 'float'
         # update recipient data
         df2.iat[rowindex2, colindex2head] = leaf                      # move playhead
-        df2.iat[rowindex2, colindex2delt] += minutes                  # bump existing, integer valued
-        # debug reporting / negative durations should never exist
-        minstr = '{0:+0.2f}'.format(minutes)
-        msg = 'minutes = {0:>7s} | zoom minutes ={1:4d} | join = {2} | leaf = {3} | head = {4} | key = {5}'.format(minstr, zoommins, join, leaf, currenthead, value)
-        if minutes < 0.0:
-            report("negative duration", msg)
+        df2.iat[rowindex2, colindex2delt] += minutes                  # bump existing
+
+    df2 = df2.sort_values(by=['Delta'])                               # sort on final duration
+    return df2
+
+# grouped engines, one vectorized pass over the original dataframe
+# these are the default and should match the reference loops above
+
+def stockSecondDfIgnoreGaps(df, df2, mainkey):                        # load recipient dataframe and return same
+    import pandas
+    deport()
+    deport("stocking groupby")
+    codes, uniques, joins, leafs = sessionArrays(df, mainkey)
+    firstjoins = pandas.Series(joins).groupby(codes).min().to_numpy() # first appearance, one per code in code order
+    lastleafs = pandas.Series(leafs).groupby(codes).max().to_numpy()  # final departure
+    minutes = (lastleafs - firstjoins) / 60.0                         # floating point-valued
+    df2['Join'] = stockByCode(df2, mainkey, uniques, fromEpochSeconds(firstjoins))
+    df2['Leaf'] = stockByCode(df2, mainkey, uniques, fromEpochSeconds(lastleafs))
+    df2['Delta'] = stockByCode(df2, mainkey, uniques, minutes).astype('float64')
+    df2 = df2.sort_values(by=['Delta'])                               # sort
+    return df2
 
+def stockSecondDfConsiderGaps(df, df2, mainkey):                      # load recipient dataframe and return same
+    import numpy
+    import pandas
+    # each session contributes the time it extends beyond the leave time of the previous session by the same participant
+    deport()
+    deport("stocking groupby")
+    codes, uniques, joins, leafs = sessionArrays(df, mainkey)         # seconds since epoch
+    order = numpy.lexsort((leafs, joins, codes))                      # CAUTION: sort on participant then join then leave is essential
+    codes = codes[order]
+    joins = joins[order]
+    leafs = leafs[order]
+    starts = numpy.ones(len(codes), dtype=bool)                       # first session of each participant
+    starts[1:] = codes[1:] != codes[:-1]
+    playheads = numpy.roll(leafs, 1)                                  # playhead before each session, the previous leave
+    playheads[starts] = 0                                             # 1970-01-01 as per the reference loop
+    durations = leafs - numpy.maximum(joins, playheads)               # seconds
+    durations = numpy.clip(durations, 0, None)                        # overlapped sessions clamp to zero
+    ends = numpy.ones(len(codes), dtype=bool)                         # last session of each participant
+    ends[:-1] = starts[1:]
+    minutes = numpy.bincount(codes, weights=durations, minlength=len(uniques)) / 60.0  # whole seconds sum exactly
+    df2['Join'] = stockByCode(df2, mainkey, uniques[codes[starts]], fromEpochSeconds(joins[starts]))
+    lastleafs = pandas.Series(leafs).groupby(codes).max().to_numpy()  # final departure
+    df2['Leaf'] = stockByCode(df2, mainkey, uniques, fromEpochSeconds(lastleafs))
+    df2['Delta'] = stockByCode(df2, mainkey, uniques, minutes).astype('float64')
+    df2['Playhead'] = stockByCode(df2, mainkey, uniques[codes[ends]], fromEpochSeconds(leafs[ends]))  # final playhead is the leave of the latest joined session
     df2 = df2.sort_values(by=['Delta'])                               # sort on final duration
     return df2
 
+# streaming engine, fold fixed-size chunks into per-participant state
+# memory then depends on the number of participants rather than the number of sessions
+
+def mergeIntervals(df, mainkey):                                      # collapse sessions into disjoint intervals per participant and return same
+    import numpy
+    import pandas
+    if df[mainkey].isna().any():
+        df = df[df[mainkey].notna()]                                  # keeps session counts aligned with the arrays
+    codes, uniques, joins, leafs = sessionArrays(df, mainkey)         # seconds since epoch
+    if 'Sessions' in df: counts = df['Sessions'].fillna(1).to_numpy(dtype='int64')  # merged intervals carry their session counts, raw sessions count one
+    else:                counts = numpy.ones(len(df), dtype='int64')
+    order = numpy.lexsort((joins, codes))                             # CAUTION: sort on participant then join is essential
+    codes = codes[order]
+    joins = joins[order]
+    leafs = leafs[order]
+    counts = counts[order]
+    starts = numpy.ones(len(codes), dtype=bool)                       # first session of each participant
+    starts[1:] = codes[1:] != codes[:-1]
+    heads = pandas.Series(leafs).groupby(codes).cummax().to_numpy()   # running maximum of leave times
+    playheads = numpy.roll(heads, 1)
+    blocks = starts | (joins > playheads)                             # a gap opens a new interval
+    firsts = numpy.flatnonzero(blocks)
+    if len(firsts):
+        lasts = numpy.maximum.reduceat(leafs, firsts)                 # latest leave within each interval
+        counts = numpy.add.reduceat(counts, firsts)                   # sessions within each interval
+    else:
+        lasts = leafs                                                 # no sessions
+    df3 = pandas.DataFrame({ mainkey    : uniques[codes[firsts]],
+                             'Join'     : fromEpochSeconds(joins[firsts]),
+                             'Leaf'     : fromEpochSeconds(lasts),
+                             'Sessions' : counts })
+    return df3
+
+def streamCsv(fd, names, mainkey, ignoregaps, chunksize, engine='c'):  # read and stock open file 'fd' chunk by chunk and return recipient, interval, and anomaly dataframes
+    import pandas
+    deport()
+    deport("stocking chunks", chunksize)
+    checkTimeCols(names)
+    csvkey = [col for col, name in sessionCols.items() if name == mainkey][0]
+    if engine == 'pyarrow': engine = 'c'                              # CAUTION: pyarrow does not read in chunks
+    reader = pandas.read_csv(fd,
+                             header=None,
+                             names=names,                             # header already consumed by 'readMeta'
+                             usecols=[col for col in [csvkey, 'Join Time', 'Leave Time', 'Duration (Minutes)'] if col in names],
+                             engine=engine,
+                             chunksize=chunksize)
+    state = None                                                      # | key | Join | Leaf | Sessions | one row per disjoint interval
+    anomalies = []                                                    # flagged rows of each chunk, row numbers run on across chunks
+    chunks = 0
+    sessions = 0
+    for chunk in reader:
+        chunk = chunk.rename(columns=sessionCols)
+        chunk['Join'] = parseTimes(chunk['Join'])
+        chunk['Leaf'] = parseTimes(chunk['Leaf'])
+        chunks += 1
+        sessions += len(chunk)
+        anomalies.append(validateSessions(chunk, mainkey))
+        chunk = usableSessions(chunk).drop(columns=['Minutes'], errors='ignore')
+        if state is not None:
+            chunk = pandas.concat([state, chunk], ignore_index=True)
+        state = mergeIntervals(chunk, mainkey)
+    deport("chunks read", chunks)
+    report("sessions streamed", sessions)
+    if state is None:                                                 # empty file
+        state = pandas.DataFrame({ mainkey : [], 'Join' : pandas.to_datetime([]), 'Leaf' : pandas.to_datetime([]), 'Sessions' : [] })
+        anomalies.append(validateSessions(state, mainkey))
+    return stockIntervals(state, mainkey, ignoregaps), state, pandas.concat(anomalies, ignore_index=True)
+
+def stockIntervals(state, mainkey, ignoregaps):                       # stock recipient dataframe from disjoint intervals and return same
+    import numpy
+    import pandas
+    codes, uniques, joins, leafs = sessionArrays(state, mainkey)      # seconds since epoch
+    firstjoins = pandas.Series(joins).groupby(codes).min().to_numpy() # first join and last leave are the same for both gap treatments
+    lastleafs = pandas.Series(leafs).groupby(codes).max().to_numpy()
+    df2 = pandas.DataFrame({ mainkey : uniques,
+                             'Join'  : fromEpochSeconds(firstjoins),
+                             'Leaf'  : fromEpochSeconds(lastleafs) })
+    if ignoregaps:
+        minutes = (lastleafs - firstjoins) / 60.0
+    else:
+        minutes = numpy.bincount(codes, weights=leafs - joins, minlength=len(uniques)) / 60.0
+    df2['Delta'] = minutes.astype('float64')
+    df2['Sessions'] = numpy.bincount(codes, weights=state['Sessions'], minlength=len(uniques)).astype('int64')
+    if not ignoregaps:
+        df2['Playhead'] = df2['Leaf']                                 # final playhead is the last leave
+    df2 = df2.sort_values(by=['Delta'])                               # sort on final duration
+    return df2
+
+# data quality, anomalous session rows are flagged in bulk, those without a key
+# or with missing or reversed times are then left out of stocking by every engine
+
+anomalyFlags = ['leave-before-join', 'missing-key', 'missing-join', 'missing-leave', 'minutes-mismatch']
+
+def validateSessions(df, mainkey):                                    # flag anomalous session rows and return them as a dataframe
+    """check all session rows at once and return those flagged
+
+    * leave before join, a missing key, missing or unparsed join and leave times, and Zoom's own
+      'Minutes' differing from the leave less join by 'minutesTolerance' or more (Zoom rounds up)
+    * the result holds the session row number counting from one after the header, the flags
+      separated by "|", the times, and both durations : | row | flags | join | leave | zoom_minutes | minutes |
+    """
+
+    import numpy
+    import pandas
+    seconds = (df['Leaf'] - df['Join']).dt.total_seconds().to_numpy() # NaN where either time is missing
+    masks = { 'leave-before-join' : seconds < 0,
+              'missing-key'       : df[mainkey].isna().to_numpy(),
+              'missing-join'      : df['Join'].isna().to_numpy(),
+              'missing-leave'     : df['Leaf'].isna().to_numpy() }
+    if 'Minutes' in df:
+        zoommins = df['Minutes'].to_numpy(dtype='float64')
+        masks['minutes-mismatch'] = numpy.abs(zoommins - seconds / 60.0) >= minutesTolerance
+    else:
+        zoommins = numpy.full(len(df), numpy.nan)
+        masks['minutes-mismatch'] = numpy.zeros(len(df), dtype=bool)
+    rows = numpy.flatnonzero(numpy.logical_or.reduce(list(masks.values())))
+    flags = pandas.Series('', index=range(len(rows)), dtype=object)
+    for name in anomalyFlags:                     # string work on flagged rows only
+        hit = masks[name][rows]
+        flags[hit] = flags[hit] + '|' + name
+    return pandas.DataFrame({ 'row'          : df.index.to_numpy()[rows] + 1,
+                              'flags'        : flags.str.lstrip('|'),
+                              'join'         : df['Join'].to_numpy()[rows],
+                              'leave'        : df['Leaf'].to_numpy()[rows],
+                              'zoom_minutes' : zoommins[rows],
+                              'minutes'      : numpy.round(seconds[rows] / 60.0, 4) })
+
+def usableSessions(df):                          # return session rows with both times in order, the others cannot be stocked
+    usable = df['Join'].notna() & df['Leaf'].notna() & (df['Leaf'] >= df['Join'])
+    if usable.all(): return df
+    return df[usable]
+
+def sayAnomalies(anomalies):                      # report anomaly counts by flag
+    report()
+    report("anomalous sessions", len(anomalies))
+    counts = anomalies['flags'].str.split('|').explode().value_counts()
+    for name in anomalyFlags:
+        report(name, int(counts.get(name, 0)))
+
+def writeAnomalies(filename, anomalies):         # write flagged session rows as CSV and return success
+    report()
+    report("anomaly file", filename)
+    try:
+        anomalies.to_csv(filename, index=False)
+    except (IOError, OSError):
+        report("file open error", filename)
+        return False
+    return True
+
 def extractCol(df, fieldname, cutoff):                                # extract a column and return as list
     mysep = "\n"                                                      # one value per line
     report()
-    column = df[fieldname].tolist()
-    column.sort()                                                     # redundant statement in this use case
-    participants = len(column)
+    column = df[fieldname].astype('float64').round(4).tolist()        # whole seconds need four decimals only
+    participants = len(column)                                        # CAUTION: already sorted on 'Delta' when stocked
     report("participants", participants)
-    cutlen = sum(1 for i in column if i >= cutoff)
+    cutlen = retentionCurve(column, [cutoff])[0]
     report ("stayed " + str(cutoff) + " or more", cutlen)
     return column
 
-def getStub():                                    # generate stub name for creating files
+# retention curve, participants staying for at least each of several cutoffs
+
+def argCutoffs(value):                            # parse a cutoff list for option '--retention' and return (number, percent) pairs
+    """parse comma-separated cutoffs in minutes
+
+    * an item is a number "20", or an inclusive range "0-60" or "0-60/5" in steps of one or the given step
+    * a trailing "%" makes the item a percentage of the nominal duration, else of the longest duration
+    """
+
+    items = []
+    for item in value.split(','):
+        item = item.strip()
+        percent = item.endswith('%')
+        if percent: item = item[:-1]
+        match = re.fullmatch(r'(\d+(?:\.\d+)?)(?:-(\d+(?:\.\d+)?)(?:/(\d+(?:\.\d+)?))?)?', item)
+        if not match:
+            raise argparse.ArgumentTypeError("%s is not a cutoff list such as 10,20,30 or 0-60/5 or 25-100/25%%" % value)
+        first = float(match.group(1))
+        last = float(match.group(2) or first)
+        step = float(match.group(3) or 1)
+        if last < first or step <= 0:
+            raise argparse.ArgumentTypeError("%s holds an empty range" % value)
+        count = int((last - first) / step + 1e-9) + 1                 # inclusive of 'last' despite float steps
+        items.extend((round(first + i * step, 4), percent) for i in range(count))
+    return items
+
+def resolveCutoffs(items, reference):             # convert (number, percent) pairs to sorted unique cutoffs in minutes
+    cutoffs = set()
+    for number, percent in items:
+        if percent: cutoffs.add(round(number * reference / 100.0, 4))
+        else:       cutoffs.add(number)
+    return sorted(cutoffs)
+
+def retentionCurve(durations, cutoffs):           # return the count of durations at or above each cutoff
+    """binary search each cutoff in the ascending 'durations'
+
+    * 'durations' must be sorted, as the per-participant durations are
+    * the count for a cutoff is the number of durations from its leftmost insertion point onwards
+    """
+
+    import numpy
+    column = numpy.asarray(durations, dtype='float64')
+    points = numpy.searchsorted(column, numpy.asarray(cutoffs, dtype='float64'), side='left')
+    return (len(column) - points).tolist()
+
+def sayRetention(cutoffs, counts, participants):  # report retention curve as a table
+    report()
+    report("retention cutoffs", len(cutoffs))
+    for cutoff, count in zip(cutoffs, counts):
+        if participants: share = 100.0 * count / participants
+        else:            share = 0.0
+        report("stayed {0:g} or more".format(cutoff), "{0:d} ({1:0.1f}%)".format(count, share))
+
+def retentionRows(cutoffs, counts):               # format retention curve as DAT rows: cutoff minutes and count
+    return ['{0:g} {1:d}'.format(cutoff, count) for cutoff, count in zip(cutoffs, counts)]
+
+# concurrency timeline, a sweep line over the disjoint per-participant intervals
+
+def sweepTimeline(intervals):                                         # return peak count, time of peak, and per-minute counts
+    """count connected participants over the meeting
+
+    * 'intervals' holds disjoint intervals per participant so that overlapping sessions count once
+    * the peak is found by a sweep over sorted join (+1) and leave (-1) events, with leaves first on ties
+    * the per-minute counts, a series indexed by timestamp, give those connected at the start of each minute
+    """
+
+    import numpy
+    import pandas
+    joins = epochSeconds(intervals['Join'])
+    leafs = epochSeconds(intervals['Leaf'])
+    if len(joins) == 0:
+        return 0, None, pandas.Series([], dtype='int64')
+    times = numpy.concatenate((joins, leafs))
+    steps = numpy.concatenate((numpy.ones(len(joins), dtype='int64'), -numpy.ones(len(leafs), dtype='int64')))
+    order = numpy.lexsort((steps, times))                             # CAUTION: leave before join at the same instant
+    counts = numpy.cumsum(steps[order])
+    peakindex = int(numpy.argmax(counts))
+    peak = int(counts[peakindex])
+    peaktime = pandas.Timestamp(times[order][peakindex], unit='s')
+    minute = 60                                                       # seconds
+    grid = numpy.arange(joins.min() // minute * minute, leafs.max() + 1, minute)
+    joins = numpy.sort(joins)                                         # CAUTION: copies, the originals may be read-only views
+    leafs = numpy.sort(leafs)
+    present = numpy.searchsorted(joins, grid, side='right') - numpy.searchsorted(leafs, grid, side='right')
+    perminute = pandas.Series(present, index=fromEpochSeconds(grid))
+    return peak, peaktime, perminute
+
+def sayTimeline(peak, peaktime, perminute):       # report concurrency timeline
+    report()
+    report("peak concurrent", peak)
+    report("peak time", peaktime)
+    report("timeline minutes", len(perminute))
+
+def timelineRows(perminute):                      # format per-minute counts as DAT rows: minute offset and count
+    return ['{0:d} {1:d}'.format(i, int(count)) for i, count in enumerate(perminute)]
+
+# presence matrix, one bit per participant and meeting minute, for window queries and heatmaps
+
+def presenceMatrix(intervals, keys, mainkey):     # return first minute, bit-packed participant by minute presence, and minute count
+    """mark the minutes overlapped by the disjoint intervals of each participant
+
+    * row i belongs to 'keys[i]', column m to the minute starting 'm' minutes after the first minute,
+      which is the minute of the earliest join as for the timeline
+    * a bit is set when any interval overlaps the minute, a zero-length session holds its own minute
+    * rows are packed eight minutes to a byte with 'numpy.packbits', the first minute in the high bit
+    """
+
+    import numpy
+    import pandas
+    rows = pandas.Index(keys).get_indexer(intervals[mainkey])        # row of each interval, -1 when not a participant
+    joins = epochSeconds(intervals['Join'])
+    leafs = epochSeconds(intervals['Leaf'])
+    keep = rows >= 0
+    rows, joins, leafs = rows[keep], joins[keep], leafs[keep]
+    if len(rows) == 0:
+        return None, numpy.zeros((len(keys), 0), dtype='uint8'), 0
+    minute = 60                                                       # seconds
+    start = joins.min() // minute * minute
+    firsts = (joins - start) // minute
+    lasts = numpy.maximum(firsts, -((start - leafs) // minute) - 1)   # minute before the ceiling of the leave
+    minutes = int(lasts.max()) + 1
+    steps = numpy.zeros((len(keys), minutes + 1), dtype='int32')      # +1 where an interval opens, -1 after it closes
+    numpy.add.at(steps, (rows, firsts), 1)
+    numpy.add.at(steps, (rows, lasts + 1), -1)
+    present = numpy.cumsum(steps[:, :-1], axis=1) > 0
+    return pandas.Timestamp(start, unit='s'), numpy.packbits(present, axis=1), minutes
+
+def argWindow(value):                             # parse a minute window for option '--window' and return (first, last) with 'None' for open ends
+    match = re.fullmatch(r'(-?\d+)?:(-?\d+)?', value.strip())
+    if not match:
+        raise argparse.ArgumentTypeError("%s is not a minute window such as 0:15 or -15:" % value)
+    return tuple(None if group is None else int(group) for group in match.groups())
+
+def windowLabel(window):                          # format a window as given
+    return ':'.join('' if end is None else str(end) for end in window)
+
+def presentDuring(bits, minutes, window, throughout=False):  # return per-participant presence within a minute window
+    """test every participant against 'window', minutes counted from the first minute as a Python slice
+
+    * negative ends count back from the last minute, so "-15:" is the final quarter hour
+    * only the bytes the window touches are read, one 'and' per participant and byte
+    * 'throughout' requires every minute of the window, otherwise any minute will do
+    """
+
+    import numpy
+    first, last, step = slice(*window).indices(minutes)
+    if first >= last:                                                 # empty window, nobody present
+        return numpy.zeros(len(bits), dtype=bool)
+    mask = numpy.zeros(minutes, dtype=bool)
+    mask[first:last] = True
+    mask = numpy.packbits(mask)[first // 8:(last + 7) // 8]
+    hits = bits[:, first // 8:(last + 7) // 8] & mask
+    if throughout: return (hits == mask).all(axis=1)
+    return hits.any(axis=1)
+
+def windowCounts(bits, minutes, windows, throughout=False):  # return per-window presence counts and the count present in every window
+    import numpy
+    hits = [presentDuring(bits, minutes, window, throughout) for window in windows]
+    both = numpy.logical_and.reduce(hits)
+    return [int(hit.sum()) for hit in hits], int(both.sum())
+
+def sayWindows(windows, counts, both):           # report window presence counts
+    report()
+    for window, count in zip(windows, counts):
+        report("present " + windowLabel(window), count)
+    if len(windows) > 1:
+        report("present in every window", both)
+
+def plotPresence(bits, minutes, start, plottitle, stub, plotformat='svg'):
+    """save the presence matrix as a heatmap and return the file name
+
+    * rows follow the bar graph, persons in order of duration, and columns are minutes from 'start'
+    * rendered headless to 'stub' plus "-presence" and the extension 'plotformat'
+    """
+
+    import numpy
+    import matplotlib
+    matplotlib.rcParams['svg.hashsalt'] = 'zoompart'                  # stable SVG element identifiers
+    from matplotlib.figure import Figure
+
+    present = numpy.unpackbits(bits, axis=1, count=minutes)
+    figure = Figure(figsize=(8,6), dpi=200)                           # unknown to 'pyplot', so never displayed nor accumulated
+    axes = figure.add_subplot(1, 1, 1)
+    axes.imshow(present, aspect='auto', interpolation='nearest', origin='lower', cmap='Greys', extent=(0, minutes, 0, len(present)))
+    axes.set_title(plottitle)
+    if start is None: axes.set_xlabel("meeting minute")
+    else:             axes.set_xlabel("minutes from {0:s}".format(start.strftime('%Y-%m-%d %H:%M')))
+    axes.set_ylabel("person number (count {0:d})".format(len(present)))
+
+    filename = stub + "-presence." + plotformat
+    if plotformat == 'svg': metadata = { 'Date' : None }              # omit timestamp
+    else:                   metadata = {}
+    figure.savefig(filename, format=plotformat, metadata=metadata)
+    report("presence plot file", filename)
+    return filename
+
+def getStub(plottitle):                           # generate stub name for creating files
     deport()
     script = os.path.basename(sys.argv[0])
     stub_1 = os.path.splitext(script)[0]          # based on script name
-    stub_2 = re.sub(' +', '-', plotTitle)         # based on plot title
+    stub_2 = re.sub(' +', '-', plottitle)         # based on plot title
     stub_2 = stub_2.lower()                       # downcase
     stub = stub_2                                 # control which 'stub' to use here
     deport("filename stub", stub)
     return stub
 
-def writeDatFile(filename, data, sep):           # create DAT file
+def writeDatFile(filename, data, sep):           # create DAT file and return success
     deport()
     deport("writing DAT file")
     report()
@@ -436,7 +1339,8 @@ def writeDatFile(filename, data, sep):           # create DAT file
         os.chmod(filename, readonlyPerms)
     except IOError:
         report("file open error", filename)
-        exitCode = ExitCode.datIssue.value                            # update exit code
+        return False
+    return True
 
 def mvSvgCall(localSvg):                          # useful reporting
     default = "Figure_1.svg"
@@ -451,12 +1355,765 @@ def myexit(exitcode):                             # common point of exit
     report()
     sys.exit(exitcode)
 
+# --------------------------------------
+#  instrumentation
+# --------------------------------------
+
+def peakRss():                                    # peak resident set size in bytes, or 'None' where unsupported
+    try:
+        import resource
+    except ImportError:                           # not available on Windows
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin': return maxrss    # bytes on macOS
+    return maxrss * 1024                          # kilobytes elsewhere
+
+class Profile:
+    """per-stage wall time, CPU time, row count, and peak RSS for one CSV file
+
+    * each stage is recorded under 'with profile.stage(name) as record:' and the block may set record['rows']
+    * 'asDict' returns a JSON-serializable record
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self.stages = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        record = { 'stage' : name, 'rows' : None }
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall'] = round(time.perf_counter() - wall, 6)       # seconds
+            record['cpu'] = round(time.process_time() - cpu, 6)
+            record['peakrss'] = peakRss()
+            self.stages.append(record)
+
+    def asDict(self):
+        return { 'target' : self.target,
+                 'wall'   : round(sum(record['wall'] for record in self.stages), 6),
+                 'cpu'    : round(sum(record['cpu'] for record in self.stages), 6),
+                 'stages' : self.stages }
+
+def writeProfile(filename, records):             # append profile records as JSON lines to 'filename', '-' is standard output, and return success
+    lines = [json.dumps(record, default=str) for record in records]
+    if filename == '-':
+        for line in lines: print(line)
+        return True
+    try:
+        with open(filename, 'a') as fd:
+            for line in lines: print(line, file=fd)
+    except IOError:
+        report("file open error", filename)
+        return False
+    return True
+
+# --------------------------------------
+#  results cache
+# --------------------------------------
+
+# stocked dataframes are pickled under the content hash of the CSV file plus
+# the deduplication key and gap treatment, the least recently used entries are
+# evicted once the directory exceeds its size limit
+
+cacheFormat = "7"                                 # bump to invalidate existing entries
+
+def cacheDirectory(cachedir=None):                # resolve cache directory and return same
+    if cachedir: return os.path.expanduser(cachedir)
+    xdg = os.environ.get('XDG_CACHE_HOME')
+    if xdg: return os.path.join(xdg, os.path.basename(cacheDirDefault))
+    return os.path.expanduser(cacheDirDefault)
+
+def fileHash(csvtarget):                          # return SHA-256 object fed with file content, decompressed
+    import hashlib
+    sha = hashlib.sha256()
+    with openBinary(csvtarget) as fd:
+        for block in iter(lambda: fd.read(1 << 20), b''):
+            sha.update(block)
+    return sha
+
+def cacheDigest(digest, mainkey, ignoregaps, streamed=False):  # hash file content digest and stocking options and return hex digest
+    import hashlib
+    import pandas
+    sha = hashlib.sha256(digest.encode())
+    sha.update('|{0:s}|{1:s}|{2:s}'.format(cacheFormat, mainkey, str(bool(ignoregaps))).encode())
+    sha.update('|{0:s}'.format(pandas.__version__).encode())        # pickled dataframes need not load under another pandas
+    if streamed and not ignoregaps:               # streamed durations are the union of the sessions, see 'stockIntervals'
+        sha.update(b'|streamed')
+    if mainkey == 'Identity':
+        sha.update('|{0!r}'.format(fuzzyThreshold).encode())
+    return sha.hexdigest()
+
+def cacheLoad(cachedir, digest):                  # return cached meta, stocked, interval, and anomaly dataframes, or 'None'
+    import pickle
+    filename = os.path.join(cachedir, digest + ".pkl")
+    try:
+        with open(filename, 'rb') as fd:
+            entry = pickle.load(fd)
+        os.utime(filename)                        # mark as recently used
+    except FileNotFoundError:
+        deport("cache miss", digest[:16])
+        return None
+    except Exception as e:                        # CAUTION: unpickling can raise anything, a bad entry is a miss
+        report("cache entry dropped", "{0:s}: {1:s}".format(digest[:16], type(e).__name__))
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+        return None
+    report("cache hit", digest[:16])
+    return entry
+
+def cacheStore(cachedir, digest, entry, limit):   # write cache entry and evict as required
+    import pickle
+    filename = os.path.join(cachedir, digest + ".pkl")
+    interim = "{0:s}.{1:d}.tmp".format(filename, os.getpid())
+    try:
+        os.makedirs(cachedir, exist_ok=True)
+        with open(interim, 'wb') as fd:
+            pickle.dump(entry, fd, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(interim, filename)             # atomic, concurrent batch workers are safe
+    except IOError:
+        report("cache write error", filename)
+        return
+    deport("cache store", digest[:16])
+    cacheEvict(cachedir, limit)
+
+def cacheEvict(cachedir, limit):                  # remove least recently used entries beyond 'limit' megabytes
+    entries = []
+    for entry in os.scandir(cachedir):
+        if not entry.name.endswith(".pkl"): continue
+        try:
+            info = entry.stat()
+        except FileNotFoundError:                 # removed by another process
+            continue
+        entries.append((info.st_mtime, info.st_size, entry.path))
+    entries.sort()                                # oldest first
+    total = sum(size for mtime, size, path in entries)
+    for mtime, size, path in entries:
+        if total <= limit * 1024 * 1024: break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        deport("cache evict", os.path.basename(path)[:16])
+
+# --------------------------------------
+#  library interface
+# --------------------------------------
+
+class Analysis:
+    """result of analyzing a single participant CSV file
+
+    * 'target' is the CSV file analyzed
+    * 'meta' is the meta dataframe or 'None' for the newer Zoom format
+    * 'df2' is the deduplicated and stocked dataframe, sorted on 'Delta'
+    * 'intervals' holds the disjoint attendance intervals of each participant : | key | Join | Leaf | Sessions |
+    * 'durations' is the sorted list of per-participant durations in minutes
+    * 'profile' holds the stage timings, set by 'analyze'
+    * 'partial' holds the merged partial aggregate when built by 'analyzePartials', the keys then being hashes
+    * 'anomalies' holds the session rows flagged by 'validateSessions', 'None' for merged partial aggregates
+    * 'digest' is the SHA-256 hex digest of the CSV file content, taken as it was read, 'None' for merged partial aggregates
+    """
+
+    def __init__(self, target, meta, df2, intervals, durations, key, ignoregaps, cutoff):
+        self.target = target
+        self.meta = meta
+        self.df2 = df2
+        self.intervals = intervals
+        self.durations = durations
+        self.key = key
+        self.ignoregaps = ignoregaps
+        self.cutoff = cutoff
+        self.profile = Profile(target)
+        self.partial = None
+        self.anomalies = None
+        self.digest = None
+
+    @property
+    def participants(self):                       # deduplicated participant count
+        return len(self.durations)
+
+    @property
+    def engaged(self):                            # participants staying for at least 'cutoff' minutes
+        return retentionCurve(self.durations, [self.cutoff])[0]
+
+    @property
+    def hours(self):                              # cumulative participant hours
+        return sum(self.durations)/60.0
+
+    @property
+    def meetingId(self):                          # meeting ID as a string or 'None'
+        if self.meta is None: return None
+        return str(self.meta.at[0, 'MeetingID'])
+
+    @property
+    def topic(self):                              # stated topic or 'None'
+        if self.meta is None: return None
+        return str(self.meta.at[0, 'Topic'])
+
+    @property
+    def start(self):                              # meeting start, else first join
+        if self.meta is not None: return self.meta.at[0, 'Start']
+        return self.df2['Join'].min()
+
+    @property
+    def close(self):                              # meeting close, else last leave
+        if self.meta is not None: return self.meta.at[0, 'Close']
+        return self.df2['Leaf'].max()
+
+    def timeline(self):                           # return peak count, time of peak, and per-minute counts
+        return sweepTimeline(self.intervals)
+
+    def presence(self):                           # return first minute, bit-packed presence matrix in the row order of 'df2', and minute count
+        return presenceMatrix(self.intervals, self.df2[self.key], self.key)
+
+    def retention(self, items, nominal=None):     # return cutoffs and the participants staying for at least each
+        if nominal:           reference = nominal # percentages are of the nominal duration
+        elif self.durations:  reference = self.durations[-1]  # else of the longest duration
+        else:                 reference = 0
+        cutoffs = resolveCutoffs(items, reference)
+        return cutoffs, retentionCurve(self.durations, cutoffs)
+
+def stockCsv(csvtarget, mainkey, ignoregaps, loopengine, chunksize, rowslice, profile, engine='c'):
+    """read, deduplicate, and stock 'csvtarget' and return the meta dataframe (or 'None'), the stocked, interval, and anomaly dataframes,
+    and the content digest
+
+    * each stage is recorded in 'profile'
+    """
+
+    # fuzzy identities are resolved from names
+
+    if mainkey == 'Identity': readkey = 'Name'
+    else:                     readkey = mainkey
+
+    # open CSV file once and read meeting data if present
+
+    with openCsv(csvtarget) as fd:
+        with profile.stage("meta") as record:
+            meta, names = readMeta(fd)
+
+        # stream in chunks as required, the original dataframe is then never held in full
+
+        if chunksize:
+            with profile.stage("stream") as record:
+                df2, intervals, anomalies = streamCsv(fd, names, readkey, ignoregaps, chunksize, engine)
+                record['rows'] = len(df2)
+            digest = drainHash(fd)
+            if mainkey == 'Identity':             # merge intervals again once names are resolved
+                with profile.stage("identity") as record:
+                    intervals[mainkey] = resolveIdentities(intervals[readkey])
+                    intervals = mergeIntervals(intervals, mainkey)
+                    df2 = stockIntervals(intervals, mainkey, ignoregaps)
+                    record['rows'] = len(df2)
+            return meta, df2, intervals, anomalies, digest
+
+        with profile.stage("parse") as record:
+            df = readCsv(fd, names, engine)
+            record['rows'] = len(df)
+        digest = drainHash(fd)
+
+    sayDf(df, "original dataframe")
+
+    # truncate for development purposes as required
+
+    if rowslice:
+        df = truncateDf(df, rowslice)
+
+    # resolve fuzzy identities as required, these then serve as the key
+
+    if mainkey == 'Identity':
+        with profile.stage("identity") as record:
+            df[mainkey] = resolveIdentities(df[readkey])
+            record['rows'] = df[readkey].nunique()
+
+    # flag anomalous session rows in bulk
+
+    with profile.stage("validate") as record:
+        anomalies = validateSessions(df, mainkey)
+        record['rows'] = len(df)
+    df = usableSessions(df)
+
+    # create recipient dataframe and report
+
+    with profile.stage("dedup") as record:
+        df2 = createSecondDf(df, mainkey)         # 'mainkey' one of 'Name', 'Email', or 'Identity'
+        record['rows'] = len(df2)
+    sayDf(df2, "deduplicated dataframe")
+
+    # stock recipient dataframe
+
+    with profile.stage("stock") as record:
+        if   ignoregaps and loopengine: df2 = stockSecondDfIgnoreGapsLoop(df, df2, mainkey)
+        elif ignoregaps:                df2 = stockSecondDfIgnoreGaps(df, df2, mainkey)
+        elif loopengine:                df2 = stockSecondDfConsiderGapsLoop(df, df2, mainkey)
+        else:                           df2 = stockSecondDfConsiderGaps(df, df2, mainkey)
+        record['rows'] = len(df)
+    with profile.stage("intervals") as record:
+        intervals = mergeIntervals(df, mainkey)   # disjoint intervals per participant for later stages
+        record['rows'] = len(intervals)
+    return meta, df2, intervals, anomalies, digest
+
+def analyze(csvtarget, key='Email', ignoregaps=False, cutoff=cutoffDefault, loopengine=False, chunksize=0, rowslice=0,
+            cachedir=None, cachelimit=cacheLimitDefault, engine='c', digest=None):
+    """read, deduplicate, and stock a single participant CSV file and return an 'Analysis'
+
+    * 'key' is the deduplication key, one of 'Email', 'Name', or 'Identity' for fuzzily matched names
+    * 'ignoregaps' uses the first join and last leave rather than accounting for gaps and overlaps
+    * 'cutoff' is the short sessions threshold in minutes
+    * 'loopengine' selects the row-by-row reference stocking loops
+    * 'chunksize' streams the input data in chunks of that many rows when nonzero, 'rowslice' and 'loopengine' are then ignored
+    * 'rowslice' truncates the input data when nonzero
+    * 'cachedir' enables the results cache in that directory, bypassed under 'rowslice' and 'loopengine'
+    * 'cachelimit' bounds the cache size in megabytes
+    * 'engine' is the pandas CSV parser, one of 'c', 'python', or 'pyarrow'
+    * 'digest' is the content digest from 'fileHash' when already known, saving a read before a cache lookup
+    * raises 'IOError' if the file is absent or unreadable, reporting honors the module variables 'verbose' and 'quiet'
+    * stage timings are recorded in the 'profile' attribute of the result, a 'Profile'
+    """
+
+    mainkey = key
+    profile = Profile(csvtarget)
+    with profile.stage("check"):
+        readable = checkTarget(csvtarget)
+    if not readable:
+        raise IOError("absent or unreadable: " + csvtarget)
+
+    # consult cache, otherwise read and stock CSV file
+
+    usecache = cachedir and not rowslice and not loopengine and csvtarget != stdinTarget
+    cached = None
+    if usecache:
+        with profile.stage("cache") as record:
+            digest = digest or fileHash(csvtarget).hexdigest()
+            cachekey = cacheDigest(digest, mainkey, ignoregaps, bool(chunksize))
+            cached = cacheLoad(cachedir, cachekey)
+            if cached: record['rows'] = len(cached[1])
+    if cached:
+        meta, df2, intervals, anomalies = cached
+    else:
+        meta, df2, intervals, anomalies, digest = stockCsv(csvtarget, mainkey, ignoregaps, loopengine, chunksize, rowslice, profile, engine)
+        if usecache:
+            with profile.stage("cache store"):
+                cacheStore(cachedir, cachekey, (meta, df2, intervals, anomalies), cachelimit)
+
+    # report meeting data
+
+    if meta is None:
+        report("caution", "CSV file does not contain meeting information")
+    else:
+        sayDf(meta, "meta dataframe")
+        sayMeta(meta)
+    sayDf(df2, "ratcheted dataframe", 0)          # zero is print entire dataframe
+    sayAnomalies(anomalies)
+
+    # extract column and report
+
+    with profile.stage("extract") as record:
+        cumulatives = extractCol(df2, 'Delta', cutoff)
+        record['rows'] = len(cumulatives)
+
+    # sum the deltas and report
+
+    cumminutes = sum(cumulatives)
+    cumhours = cumminutes/60.0
+    cumhourstr = format("%0.1f" % (cumhours))
+    report("cumulative hours", cumhourstr)
+
+    result = Analysis(csvtarget, meta, df2, intervals, cumulatives, mainkey, ignoregaps, cutoff)
+    result.profile = profile
+    result.anomalies = anomalies
+    result.digest = digest
+    return result
+
+# --------------------------------------
+#  partial aggregates
+# --------------------------------------
+
+# the disjoint intervals of each participant are a mergeable summary of a
+# meeting: shards of one export, or parallel breakout meetings, are stocked
+# independently and reduced anywhere, the merge being associative and
+# commutative, and stocking the merged intervals gives the same durations as a
+# streamed run over all the rows under '--chunk-size'
+#
+#   { "format" : "zoompart-partial", "version" : 1, "key" : "Email", "salt" : "<mark>",
+#     "sources" : [ { "meeting" : "123456789", "file" : "participants_123456789.csv" } ],
+#     "participants" : { "<hashed key>" : [ [ join, leave, sessions ], ... ] } }
+#
+# joins and leaves are seconds since epoch, intervals are sorted and disjoint,
+# so the first join and last leave of a participant are the ends of the list
+
+partialFormat = "zoompart-partial"
+partialVersion = 1
+
+def framePartial(intervals, key, salt, sources):  # return partial aggregate of an interval dataframe whose keys are hashed already
+    codes, uniques, joins, leafs = sessionArrays(intervals, key)
+    counts = intervals['Sessions'].to_numpy(dtype='int64')
+    participants = {}
+    for code, join, leaf, count in zip(codes.tolist(), joins.tolist(), leafs.tolist(), counts.tolist()):
+        participants.setdefault(uniques[code], []).append([join, leaf, count])
+    return { 'format'       : partialFormat,
+             'version'      : partialVersion,
+             'key'          : key,
+             'salt'         : salt,
+             'sources'      : sources,
+             'participants' : participants }
+
+def partialFrame(partial):                        # return interval dataframe of a partial aggregate : | key | Join | Leaf | Sessions |
+    import pandas
+    entries = partial['participants']
+    keys = [hashed for hashed, intervals in entries.items() for interval in intervals]
+    rows = [interval for intervals in entries.values() for interval in intervals]
+    if rows: joins, leafs, counts = zip(*rows)
+    else:    joins, leafs, counts = [], [], []
+    return pandas.DataFrame({ partial['key'] : pandas.Series(keys, dtype=object),
+                              'Join'         : fromEpochSeconds(pandas.Series(joins, dtype='int64')),
+                              'Leaf'         : fromEpochSeconds(pandas.Series(leafs, dtype='int64')),
+                              'Sessions'     : pandas.Series(counts, dtype='int64') })
+
+def partialState(result):                         # return partial aggregate of an 'Analysis'
+    """hash the keys of the disjoint intervals of 'result' into a partial aggregate
+
+    * keys are hashed with the export salt, so shards to be merged need the same ZOOMPART_SALT,
+      and the salt is recorded only as a hash of its own
+    * a merged result returns its merged partial aggregate unchanged
+    """
+
+    if result.partial is not None: return result.partial
+    salt = exportSalt()
+    intervals = result.intervals[result.intervals[result.key].notna()].copy()
+    uniques = intervals[result.key].astype(object).unique()
+    hashes = { key : hashKey(salt, key) for key in uniques }
+    intervals[result.key] = intervals[result.key].astype(object).map(hashes)
+    sources = [{ 'meeting' : meetingLabel(result), 'file' : os.path.basename(result.target) }]
+    return framePartial(intervals, result.key, hashKey(salt, partialFormat), sources)
+
+def mergePartials(partials):                      # reduce partial aggregates to one and return same
+    import pandas
+    first = partials[0]
+    for partial in partials[1:]:
+        if partial['key'] != first['key']:
+            raise ValueError("partial aggregates deduplicate on different keys: {0:s} and {1:s}".format(first['key'], partial['key']))
+        if partial['salt'] != first['salt']:
+            raise ValueError("partial aggregates are hashed with different salts, set ZOOMPART_SALT alike for every shard")
+    if len(partials) == 1: return first
+    intervals = pandas.concat([partialFrame(partial) for partial in partials], ignore_index=True)
+    intervals = mergeIntervals(intervals, first['key'])
+    sources = [source for partial in partials for source in partial['sources']]
+    return framePartial(intervals, first['key'], first['salt'], sources)
+
+def readPartial(filename):                        # read a partial aggregate file and return same, raising ValueError on a bad file
+    with open(filename) as fd:
+        try:
+            partial = json.load(fd)
+        except json.JSONDecodeError as e:
+            raise ValueError("{0:s} is not JSON: {1:s}".format(filename, str(e)))
+    if not isinstance(partial, dict) or partial.get('format') != partialFormat:
+        raise ValueError(filename + " is not a partial aggregate")
+    if partial.get('version') != partialVersion:
+        raise ValueError("{0:s} has partial aggregate version {1:s}, not {2:d}".format(filename, str(partial.get('version')), partialVersion))
+    return partial
+
+def writePartial(filename, partial):             # write partial aggregate to 'filename' and return success
+    report()
+    report("partial file", filename)
+    try:
+        with open(filename, 'w') as fd:
+            json.dump(partial, fd, separators=(',', ':'))
+    except IOError:
+        report("file open error", filename)
+        return False
+    return True
+
+def analyzePartials(partialfiles, ignoregaps=False, cutoff=cutoffDefault):
+    """merge partial aggregate files and return an 'Analysis' as if of a single CSV file holding all their rows
+
+    * 'ignoregaps' and 'cutoff' are as for 'analyze', the key being that of the partial aggregates
+    * the result has no meeting data and its keys are hashes, its 'partial' attribute holds the merged partial aggregate
+    * raises 'IOError' if a file is absent or unreadable and 'ValueError' if the files cannot be merged
+    """
+
+    target = partialfiles[0]
+    profile = Profile(target)
+    with profile.stage("partial read") as record:
+        partials = [readPartial(partialfile) for partialfile in partialfiles]
+        record['rows'] = sum(len(partial['participants']) for partial in partials)
+    with profile.stage("merge") as record:
+        partial = mergePartials(partials)
+        intervals = partialFrame(partial)
+        record['rows'] = len(intervals)
+    report("partial files", len(partialfiles))
+    report("merged sources", len(partial['sources']))
+    mainkey = partial['key']
+    with profile.stage("stock") as record:
+        df2 = stockIntervals(intervals, mainkey, ignoregaps)
+        record['rows'] = len(df2)
+    sayDf(df2, "ratcheted dataframe", 0)          # zero is print entire dataframe
+    with profile.stage("extract") as record:
+        cumulatives = extractCol(df2, 'Delta', cutoff)
+        record['rows'] = len(cumulatives)
+    report("cumulative hours", format("%0.1f" % (sum(cumulatives)/60.0)))
+    result = Analysis(target, None, df2, intervals, cumulatives, mainkey, ignoregaps, cutoff)
+    result.profile = profile
+    result.partial = partial
+    return result
+
+# --------------------------------------
+#  longitudinal store
+# --------------------------------------
+
+# per-participant durations of each meeting are kept in an SQLite database so
+# that recurring series can be queried without reparsing, participant keys are
+# stored only as salted hashes
+
+storeQueries = ['series', 'returning', 'engaged']
+
+storeSchema = """
+CREATE TABLE IF NOT EXISTS settings (
+    name         TEXT PRIMARY KEY,
+    value        TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS meetings (
+    id           INTEGER PRIMARY KEY,
+    meeting      TEXT NOT NULL,                   -- Zoom meeting ID, else from the filename or content hash
+    start        TEXT NOT NULL,                   -- ISO 8601, recurring meetings share their ID
+    topic        TEXT,
+    file         TEXT NOT NULL,
+    digest       TEXT NOT NULL UNIQUE,            -- SHA-256 of the CSV file content
+    UNIQUE (meeting, start));
+CREATE TABLE IF NOT EXISTS attendance (
+    meeting      INTEGER NOT NULL REFERENCES meetings (id),
+    participant  TEXT NOT NULL,                   -- salted hash of the deduplication key
+    minutes      REAL NOT NULL,
+    PRIMARY KEY (meeting, participant)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS attendance_participant ON attendance (participant, meeting);
+CREATE INDEX IF NOT EXISTS meetings_start ON meetings (start);
+"""
+
+def storeOpen(dbfile):                            # open or create the store and return the connection
+    import sqlite3
+    connection = sqlite3.connect(os.path.expanduser(dbfile), timeout=60.0)  # batch workers write concurrently
+    connection.executescript(storeSchema)
+    return connection
+
+def storeSetting(connection, name, value):        # return stored setting, recording 'value' when absent
+    connection.execute("INSERT OR IGNORE INTO settings (name, value) VALUES (?, ?)", (name, value))
+    return connection.execute("SELECT value FROM settings WHERE name = ?", (name,)).fetchone()[0]
+
+def storeIngest(dbfile, result):                  # add an 'Analysis' to the store and return whether added
+    """ingest the per-participant durations of one meeting
+
+    * a file already ingested, or another file for the same meeting and start, is skipped
+    * the meeting ID is taken from the meeting data, else from a "participants_NNN.csv" filename, else the content hash
+    * the start is the meeting start, else the first join
+    * raises 'ValueError' if the store was built on another deduplication key
+    """
+
+    import secrets
+    digest = result.digest
+    meeting = meetingLabel(result)
+    start = str(result.start)                     # ISO 8601 sorts lexically
+    connection = storeOpen(dbfile)
+    try:
+        with connection:                          # one transaction
+            key = storeSetting(connection, 'key', result.key)
+            if key != result.key:
+                raise ValueError("store keyed on {0:s} not {1:s}".format(key, result.key))
+            salt = storeSetting(connection, 'salt', secrets.token_hex(16))
+            if connection.execute("SELECT 1 FROM meetings WHERE digest = ? OR (meeting = ? AND start = ?)",
+                                  (digest, meeting, start)).fetchone():
+                report("store", "already holds " + meeting + " " + start)
+                return False
+            cursor = connection.execute("INSERT INTO meetings (meeting, start, topic, file, digest) VALUES (?, ?, ?, ?, ?)",
+                                        (meeting, start, result.topic, storeName(result.target), digest))
+            rows = { hashKey(salt, value) : round(float(minutes), 4)
+                     for value, minutes in zip(result.df2[result.key], result.df2['Delta']) if not isMissing(value) }
+            connection.executemany("INSERT INTO attendance (meeting, participant, minutes) VALUES (?, ?, ?)",
+                                   [(cursor.lastrowid, participant, minutes) for participant, minutes in rows.items()])
+    finally:
+        connection.close()
+    report("store", "added " + meeting + " " + start)
+    return True
+
+def storeName(target):                            # absolute path of a target as recorded in the store
+    if target == stdinTarget: return target
+    return os.path.abspath(target)
+
+def isMissing(value):                             # missing keys are float NaN or 'None'
+    return value is None or value != value
+
+def meetingLabel(result):                         # return meeting ID, else from a "participants_NNN.csv" filename, else from the content hash
+    if result.meetingId is not None: return result.meetingId
+    match = re.search(r'participants_(\d+)', os.path.basename(result.target))
+    if match: return match.group(1)
+    return (result.digest or fileHash(result.target).hexdigest())[:12]  # merged partial aggregates have no content digest
+
+def hashKey(salt, key):                           # salted hash of a participant key, exact so that keys deduplicated apart stay apart
+    import hashlib
+    return hashlib.sha256((salt + str(key)).encode('utf-8')).hexdigest()[:16]
+
+def storeQuery(dbfile, query, cutoff):            # run a named query and return column names and rows
+    """answer a cross-meeting query
+
+    * 'series' gives participants, those staying 'cutoff' minutes or more, and hours for each meeting
+    * 'returning' gives participants for each meeting split into those seen at an earlier meeting and those new
+    * 'engaged' gives the number of participants staying 'cutoff' minutes or more at exactly and at least N of M meetings
+    """
+
+    connection = storeOpen(dbfile)
+    try:
+        if query == 'series':
+            header = ['start', 'meeting', 'participants', 'engaged', 'hours', 'topic']
+            rows = connection.execute("""
+                SELECT m.start, m.meeting, COUNT(a.participant), IFNULL(SUM(a.minutes >= ?), 0), TOTAL(a.minutes) / 60.0, IFNULL(m.topic, '-')
+                FROM meetings m LEFT JOIN attendance a ON a.meeting = m.id
+                GROUP BY m.id ORDER BY m.start""", (cutoff,)).fetchall()
+        elif query == 'returning':
+            header = ['start', 'meeting', 'participants', 'returning', 'new']
+            rows = connection.execute("""
+                SELECT m.start, m.meeting, COUNT(*),
+                       SUM(EXISTS (SELECT 1 FROM attendance b JOIN meetings n ON n.id = b.meeting
+                                     WHERE b.participant = a.participant AND n.start < m.start))
+                FROM meetings m JOIN attendance a ON a.meeting = m.id
+                GROUP BY m.id ORDER BY m.start""").fetchall()
+            rows = [row + (row[2] - row[3],) for row in rows]
+        elif query == 'engaged':
+            header = ['sessions', 'of', 'exactly', 'at least']
+            meetings = connection.execute("SELECT COUNT(*) FROM meetings").fetchone()[0]
+            counts = dict(connection.execute("""
+                SELECT n, COUNT(*) FROM (SELECT SUM(minutes >= ?) AS n FROM attendance GROUP BY participant)
+                GROUP BY n""", (cutoff,)).fetchall())
+            rows = []
+            atleast = 0
+            for n in range(meetings, 0, -1):
+                atleast += counts.get(n, 0)
+                rows.append((n, meetings, counts.get(n, 0), atleast))
+            rows.reverse()
+        else:
+            raise ValueError("unknown query " + query)
+    finally:
+        connection.close()
+    return header, rows
+
+def runQueries(dbfile, queries, cutoff):          # run and print named queries and return an exit code
+    if not os.path.isfile(os.path.expanduser(dbfile)):
+        report("store absent", dbfile)
+        return ExitCode.storeIssue.value
+    try:
+        for query in queries or []:
+            header, rows = storeQuery(dbfile, query, cutoff)
+            sayQuery(query, header, rows)
+    except Exception as e:
+        report("store issue", e)
+        return ExitCode.storeIssue.value
+    return ExitCode.success.value
+
+def sayQuery(query, header, rows):                # print query result as a table
+    if quiet: return
+    report()
+    report("query", query)
+    report()
+    cells = [['{0:0.1f}'.format(cell) if isinstance(cell, float) else str(cell) for cell in row] for row in rows]
+    widths = [max([len(name)] + [len(row[i]) for row in cells]) for i, name in enumerate(header)]
+    print('  '.join(name.rjust(width) for name, width in zip(header, widths)).rstrip())
+    for row in cells:
+        print('  '.join(cell.rjust(width) for cell, width in zip(row, widths)).rstrip())
+
+# --------------------------------------
+#  columnar export
+# --------------------------------------
+
+# the stocked per-participant table and the meeting data are written in bulk,
+# the participants and host only as salted hashes, so that the no personal
+# data guarantee of the DAT file is kept
+
+exportFormats = ['csv', 'parquet', 'arrow']      # 'parquet' and 'arrow' (IPC file) need pyarrow
+exportSuffixes = { 'csv' : '.csv', 'parquet' : '.parquet', 'arrow' : '.arrow' }
+exportSaltValue = None                            # set once per process
+
+def exportSalt():                                 # return hashing salt, from environment variable ZOOMPART_SALT or else random
+    global exportSaltValue
+    if exportSaltValue is None:
+        import secrets
+        exportSaltValue = os.environ.get('ZOOMPART_SALT') or secrets.token_hex(16)  # random salt cannot link exports
+    return exportSaltValue
+
+def exportFrames(result):                         # return participant and meeting dataframes for export
+    import pandas
+    salt = exportSalt()
+    df2 = result.df2[result.df2[result.key].notna()]
+    participants = pandas.DataFrame({ 'participant' : [hashKey(salt, key) for key in df2[result.key]],  # one row and one hash per deduplicated key
+                                      'first_join'  : df2['Join'].to_numpy(),
+                                      'last_leave'  : df2['Leaf'].to_numpy(),
+                                      'minutes'     : df2['Delta'].astype('float64').round(4).to_numpy(),
+                                      'sessions'    : df2['Sessions'].to_numpy() })
+    meta = result.meta
+    meeting = pandas.DataFrame({ 'meeting'           : [meetingLabel(result)],
+                                 'topic'             : [result.topic],
+                                 'start'             : [result.start],
+                                 'close'             : [result.close],
+                                 'host'              : [None if meta is None else hashKey(salt, meta.at[0, 'HostEmail'])],
+                                 'zoom_minutes'      : [None if meta is None else meta.at[0, 'Minutes']],
+                                 'zoom_participants' : [None if meta is None else meta.at[0, 'Count']],
+                                 'participants'      : [result.participants],
+                                 'engaged'           : [result.engaged],
+                                 'cutoff'            : [result.cutoff],
+                                 'hours'             : [round(result.hours, 4)],
+                                 'key'               : [result.key],
+                                 'gaps'              : [not result.ignoregaps] })
+    return participants, meeting
+
+def writeExports(result, stub, formats):          # write per-participant and meeting tables in each of 'formats' and return success
+    import importlib.util
+    if set(formats) - {'csv'} and importlib.util.find_spec('pyarrow') is None:
+        report("export issue", "pyarrow not installed")
+        return False
+    participants, meeting = exportFrames(result)
+    for fmt in formats:
+        for name, table in [('participants', participants), ('meeting', meeting)]:
+            filename = "{0:s}-{1:s}{2:s}".format(stub, name, exportSuffixes[fmt])
+            try:
+                if   fmt == 'csv':     table.to_csv(filename, index=False)
+                elif fmt == 'parquet': table.to_parquet(filename, index=False)
+                else:                  table.to_feather(filename)
+            except (IOError, OSError):
+                report("file open error", filename)
+                return False
+            report("export file", filename)
+    return True
+
 # --------------------------------------
 #  plotting function
 # --------------------------------------
 
-def plotList(column, plottitle, stub):
+plotFormats = ['svg', 'png']                      # file formats for saved plots
+plotFigure = None                                 # headless figure, reused within each process
+
+def noDisplay():                                  # return whether a plot window cannot be opened
+    if not sys.platform.startswith('linux'): return False
+    return not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+def plotList(column, plottitle, stub, nominal=None, show=True, saveplot=False, plotformat='svg', retention=None):
+    """plot durations as a bar graph and return the name of any file written
+
+    * 'retention' holds cutoffs and counts from 'retentionCurve' to overplot, each point marking
+      the first bar at or above its cutoff so that the count stands to its right
+    * 'show' opens a plot window, saving the plot beforehand under 'saveplot'
+    * otherwise the plot is rendered headless on the non-interactive Agg backend and always saved,
+      one figure being cleared and reused for each plot rendered by this process
+    * the file is 'stub' plus the extension 'plotformat', either 'svg' or 'png', and the output is
+      deterministic for the same data
+    """
+
+    global plotFigure
 
+    import matplotlib
+    if not show:                                                      # render without a display
+        matplotlib.use('Agg')
+    matplotlib.rcParams['svg.hashsalt'] = 'zoompart'                  # stable SVG element identifiers
     import matplotlib.pyplot as plt
 
     persons = len(column)
@@ -468,149 +2125,844 @@ def plotList(column, plottitle, stub):
     report("plot title", title)
     deport("persons", persons)
 
-    plt.figure(figsize=(8,6), dpi=200)                                # 'figsize' in inches, default 'dpi' is 80
-    bar = plt.bar(range(len(cumulatives)), cumulatives)               # bar graph not histogram
-
-    plt.title(title)
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-
-    if nominalDuration:                                               # overplot horizontal line
+    if show:
+        figure = plt.figure(figsize=(8,6), dpi=200)                   # 'figsize' in inches, default 'dpi' is 80
+    else:
+        if plotFigure is None:
+            from matplotlib.figure import Figure
+            plotFigure = Figure(figsize=(8,6), dpi=200)               # unknown to 'pyplot', so never displayed nor accumulated
+        figure = plotFigure
+        figure.clear()
+    axes = figure.add_subplot(1, 1, 1)
+    bar = axes.bar(range(len(column)), column)                        # bar graph not histogram
+
+    axes.set_title(title)
+    axes.set_xlabel(xlabel)
+    axes.set_ylabel(ylabel)
+
+    if nominal:                                                       # overplot horizontal line
         # overplot line
-        nomLen = int(nominalDuration)
+        nomLen = int(nominal)
         report("nominal duration line", nomLen)
-        plt.axhline(y=nomLen, color='black', linestyle='dotted')
+        axes.axhline(y=nomLen, color='black', linestyle='dotted')
         # add annotation
         offset = 0
         annot = "{0:s} {1:d}".format(annot, nomLen)
         deport("label offset", offset)
-        plt.annotate(annot, [offset, nomLen + 5])
-
-    plt.show()
-
-    if savePlotAlso:
-        svgFilename = stub + ".svg"
-        plt.savefig(filename=svgFilename, format='svg')               # this provided an empty plot for some reason, so instead save manually from plot window
+        axes.annotate(annot, [offset, nomLen + 5])
+
+    if retention:                                                     # overplot retention curve
+        cutoffs, counts = retention
+        report("retention overlay points", len(cutoffs))
+        marks = [persons - count - 0.5 for count in counts]           # left edge of the first bar reaching each cutoff
+        axes.plot(marks, cutoffs, color='tab:red', marker='o', markersize=3, linestyle='dashed', linewidth=1, label="retention curve")
+        if len(cutoffs) <= 12:                                        # label counts unless crowded
+            for mark, cutoff, count in zip(marks, cutoffs, counts):
+                axes.annotate(str(count), [mark, cutoff], xytext=(4, 2), textcoords='offset points', fontsize='small', color='tab:red')
+        axes.legend(loc='upper left')
+
+    filename = None
+    if saveplot or not show:                                          # CAUTION: save before 'show', which leaves an empty figure behind
+        filename = stub + "." + plotformat
+        if plotformat == 'svg': metadata = { 'Date' : None }          # omit timestamp
+        else:                   metadata = {}
+        figure.savefig(filename, format=plotformat, metadata=metadata)
+        report("plot file", filename)
+
+    if show:
+        plt.show()
+        plt.close(figure)
+
+    return filename
 
 # --------------------------------------
-#  active code
+#  batch processing
 # --------------------------------------
 
-# outset reporting
-
-report()                                          # add initial blank line
-scriptVer()                                       # print script version
-deport("verbose", "on")                           # report debug status
-if args.showdf: deport("show dataframes", "on")
-if args.length: deport("truncate", "active")
-pythonVer()                                       # print python version
-report("target", csvTarget)
-
-# improve pandas terminal reporting
-
-if not sys.platform == 'win32':
-    setPandasWide()                               # possibly contains OS-specific code?
-
-# process title
+# the options of one analysis and its outputs travel together as a dict, shared
+# by batch, watch, and server modes, whose server requests use the same names
+
+batchDefaults = { 'key'        : 'Email',         # deduplication key
+                  'ignoregaps' : False,
+                  'loopengine' : False,
+                  'cutoff'     : cutoffDefault,
+                  'title'      : None,            # 'None' uses each meeting topic where available
+                  'nominal'    : None,
+                  'dat'        : True,
+                  'plot'       : False,           # render the plot even without 'saveplot'
+                  'show'       : False,           # display the plot, else render it headless
+                  'saveplot'   : False,
+                  'plotformat' : 'svg',
+                  'timeline'   : False,
+                  'chunksize'  : 0,
+                  'cachedir'   : None,            # 'None' bypasses the cache
+                  'cachelimit' : cacheLimitDefault,
+                  'engine'     : 'c',
+                  'store'      : None,
+                  'exports'    : None,
+                  'retention'  : None,            # cutoffs from 'argCutoffs'
+                  'overlay'    : False,
+                  'anomalies'  : False,
+                  'presence'   : False,
+                  'windows'    : None,            # windows from 'argWindow'
+                  'throughout' : False }
+
+def batchOptions(**fields):                       # return options with defaults filled in, raising TypeError on an unknown name
+    unknown = set(fields) - set(batchDefaults)
+    if unknown:
+        raise TypeError("unknown options " + ", ".join(sorted(unknown)))
+    return dict(batchDefaults, **fields)
+
+def writeOutputs(result, stub, options):
+    """write the outputs selected in 'options' for one result and return an exit code and summary fields
+
+    * the outputs are the DAT file, anomaly file, exports, timeline, presence, retention curve, plot, and store,
+      in that order, file names starting with 'stub'
+    * a failed output is reported and the others are still written, the exit code being that of the last failure
+    * the summary fields are 'peak', 'windows', and 'retention' where computed, and 'issues' naming each failure
+    """
 
-if titleNumber: plotTitle = numberedTitleFmt.format(titleNumber)
-if plotTitle:   plotTitle = plotTitle.strip()
-else:           plotTitle = standinPlotTitle
-report("processed title", plotTitle)
+    exitCode = ExitCode.success.value
+    fields = { 'issues' : [] }
+    profile = result.profile
+    plottitle = options['title'] or result.topic or standinPlotTitle
+
+    def failed(code, issue):
+        nonlocal exitCode
+        exitCode = code
+        fields['issues'].append(issue)
+
+    if options['dat']:
+        with profile.stage("dat") as record:
+            if not writeDatFile(stub + ".dat", result.durations, "\n"):
+                failed(ExitCode.datIssue.value, "DAT file issue")
+            record['rows'] = result.participants
+
+    if options['anomalies'] and result.anomalies is not None:
+        if not writeAnomalies(stub + "-anomalies.csv", result.anomalies):
+            failed(ExitCode.datIssue.value, "anomaly file issue")
+
+    if options['exports']:
+        with profile.stage("export") as record:
+            if not writeExports(result, stub, options['exports']):
+                failed(ExitCode.datIssue.value, "export issue")
+            record['rows'] = result.participants
+
+    if options['timeline']:
+        with profile.stage("timeline") as record:
+            peak, peaktime, perminute = result.timeline()
+            record['rows'] = len(perminute)
+        sayTimeline(peak, peaktime, perminute)
+        if not writeDatFile(stub + "-timeline.dat", timelineRows(perminute), "\n"):
+            failed(ExitCode.datIssue.value, "DAT file issue")
+        fields['peak'] = peak
+
+    windows = options['windows']
+    if options['presence'] or windows:
+        with profile.stage("presence") as record:
+            start, bits, minutes = result.presence()
+            record['rows'] = len(bits)
+        report()
+        report("presence minutes", minutes)
+        deport("presence bytes", bits.nbytes)
+        if windows:
+            counts, both = windowCounts(bits, minutes, windows, options['throughout'])
+            sayWindows(windows, counts, both)
+            fields['windows'] = dict(zip(map(windowLabel, windows), counts))
+            fields['windows']['every'] = both
+        if options['presence']:
+            plotPresence(bits, minutes, start, plottitle, stub, options['plotformat'])
+
+    curve = None
+    if options['retention']:
+        with profile.stage("retention") as record:
+            curve = result.retention(options['retention'], options['nominal'])
+            record['rows'] = len(curve[0])
+        sayRetention(*curve, result.participants)
+        if not writeDatFile(stub + "-retention.dat", retentionRows(*curve), "\n"):
+            failed(ExitCode.datIssue.value, "DAT file issue")
+        fields['retention'] = [list(point) for point in zip(*curve)]
 
-# process deduplication key
+    report()
+    if options['plot'] or options['saveplot']:
+        deport("creating plot")
+        with profile.stage("plot") as record:
+            plotList(result.durations, plottitle, stub, options['nominal'], show=options['show'], saveplot=options['saveplot'],
+                     plotformat=options['plotformat'], retention=curve if options['overlay'] else None)
+            record['rows'] = result.participants
+        if options['show'] and not options['saveplot']:
+            mvSvgCall(stub + ".svg")              # passive reporting only
+    else:
+        deport("omitting plot")
+
+    if options['store']:
+        with profile.stage("store") as record:
+            try:
+                storeIngest(options['store'], result)
+            except Exception as e:
+                report("store issue", e)
+                failed(ExitCode.storeIssue.value, "store issue: " + ' '.join(str(e).split()))
+            record['rows'] = result.participants
+
+    return exitCode, fields
+
+def batchWorker(csvtarget, options, talk, digest=None, stub=None):
+    """process one CSV file in a worker process and return a summary record and the captured reporting
+
+    * 'options' holds the analysis and output options, see 'batchOptions'
+    * 'digest' is the content digest when already known, as for 'analyze'
+    * 'stub' starts the output file names, by default the CSV file name stub
+    * any exception is caught and recorded so that a single bad file cannot abort the batch
+    """
 
-if useName: participantKey = 'Name'               # deduplicate by name, less reliable as subsequent attempts may use different string
-else:       participantKey = 'Email'              # deduplicate by email address
-report("deduplication key", "'" + participantKey + "'")
+    global verbose
+    verbose = talk                                # worker processes need not inherit module state
+    profile = Profile(csvtarget)                  # replaced once analyzed
+    summary = { 'file'         : csvtarget,
+                'meeting'      : '-',
+                'participants' : 0,
+                'engaged'      : 0,
+                'hours'        : 0.0,
+                'peak'         : '-',
+                'anomalies'    : 0,
+                'status'       : 'ok' }
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        try:
+            report()
+            report("target", csvtarget)
+            result = analyze(csvtarget, options['key'], options['ignoregaps'], options['cutoff'], options['loopengine'], options['chunksize'],
+                             cachedir=options['cachedir'], cachelimit=options['cachelimit'], engine=options['engine'], digest=digest)
+            profile = result.profile
+            stub = stub or targetStub(csvtarget)                        # based on CSV filename
+            summary['anomalies'] = len(result.anomalies)
+            if result.meta is not None:
+                summary['meeting'] = result.meetingId
+            code, fields = writeOutputs(result, stub, options)
+            summary.update((name, fields[name]) for name in ['peak', 'windows', 'retention'] if name in fields)
+            if code != ExitCode.success.value:
+                summary['status'] = 'error: ' + '; '.join(fields['issues'])
+            summary['participants'] = result.participants
+            summary['engaged'] = result.engaged
+            summary['hours'] = result.hours
+        except Exception as e:
+            report("batch catch", e)
+            summary['status'] = 'error: ' + ' '.join(str(e).split())  # one line
+    summary['profile'] = profile.asDict()
+    summary['profile']['status'] = summary['status']
+    return summary, log.getvalue()
+
+def writeSummaryFile(filename, summaries):       # create batch summary table
+    report()
+    report("summary file", filename)
+    fmt = '{0:<12s} {1:>12s} {2:>8s} {3:>8s} {4:>6s} {5:<s} {6:<s}'
+    try:
+        fd = open(filename, 'w')
+        print(fmt.format('# meeting', 'participants', 'engaged', 'hours', 'peak', 'file', 'status'), file=fd)
+        for summary in summaries:
+            print(fmt.format(summary['meeting'],
+                             str(summary['participants']),
+                             str(summary['engaged']),
+                             '{0:0.1f}'.format(summary['hours']),
+                             str(summary['peak']),
+                             summary['file'],
+                             summary['status']), file=fd)
+        fd.close()
+    except IOError:
+        report("file open error", filename)
+        return False
+    return True
 
-# process cutoff
+def runBatch(csvtargets, jobs, options, summaryfile, profilefile=None):
+    """fan files out over a process pool, write the summary table, and return an exit code
 
-if givenCutoff: cutoff = givenCutoff
-else:           cutoff = cutoffDefault            # revert to default
-report("cutoff minutes", cutoff)
+    * 'options' holds the analysis and output options for every file, see 'batchOptions'
+    * a 'None' title uses each meeting topic where available, plots are saved under 'saveplot', rendered headless within the workers
+    * a 'store' is the longitudinal store, each worker adds its meeting
+    * 'profilefile' receives one JSON line per file when given
+    """
 
-# report again
+    import concurrent.futures
 
-if ignoreGaps: report("gap treatment", "simple difference between first appearance and final departure")
-else:          report("gap treatment", "consider gaps and overlaps in attendance")
+    report()
+    report("batch files", len(csvtargets))
+    report("batch workers", jobs)
+    stubs = batchStubs(csvtargets)                # CAUTION: before any work, outputs of the same name would overwrite each other
+    if stubs is None:
+        report("batch issue", "output file names cannot be told apart, the same file given twice?")
+        return ExitCode.batchIssue.value
+    for csvtarget, stub in zip(csvtargets, stubs):
+        if stub != targetStub(csvtarget): report("output stub", csvtarget + " as " + stub)
+    summaries = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(batchWorker, csvtarget, options, verbose, None, stub) for csvtarget, stub in zip(csvtargets, stubs)]
+        for future in futures:                    # collect in submission order
+            summary, log = future.result()
+            if verbose and not quiet: print(log, end='')
+            report(summary['file'], summary['status'])
+            summaries.append(summary)
+    failures = sum(1 for summary in summaries if summary['status'] != 'ok')
+    report()
+    report("batch failures", failures)
+    if not writeSummaryFile(summaryfile, summaries):
+        return ExitCode.datIssue.value
+    if profilefile and not writeProfile(profilefile, [summary['profile'] for summary in summaries]):
+        return ExitCode.datIssue.value
+    if failures:
+        return ExitCode.batchIssue.value
+    return ExitCode.success.value
 
-# check CSV file exists and is readable
+# --------------------------------------
+#  watch mode
+# --------------------------------------
 
-if not checkFile(csvTarget):
-    report("absent or unreadable", csvTarget)
-    myexit(ExitCode.noFile.value)
+def scanWatch(directory):                         # return size and modification time of each participant CSV file in 'directory'
+    signatures = {}
+    for path in batchFiles(directory):
+        try:
+            info = os.stat(path)
+        except OSError:                           # removed meanwhile
+            continue
+        signatures[path] = (info.st_size, info.st_mtime_ns)
+    return signatures
+
+def runWatch(directory, options, profilefile=None, poll=watchPollDefault):
+    """poll 'directory' and process new or changed files in this process until interrupted, return an exit code
+
+    * a file is processed once its size and modification time have held for 'watchSettle' seconds,
+      so that files still being written are left alone
+    * a file whose content hash matches its last processing is skipped
+    * each file is processed as in batch mode with 'options', plots are saved under 'saveplot' and never displayed
+    """
 
-# read in CSV file and report
+    import importlib
+    for module in ['numpy', 'pandas', 'matplotlib']:
+        importlib.import_module(module)           # warm process, pay the import costs once
 
-try:
-    meta = readMeta(csvTarget)
-except ValueError as e:
-    report ("readMeta catch", e)
-    report("caution", "CSV file does not contain meeting information")
-    csvskip = 0                                   # nothing to skip in CSV file
-except BaseException as e:
-    report("readMeta catch", e)
-    report("caution", "unexpected error")
-    csvskip = 0                                   # nothing to skip in CSV file
-else:
-    sayDf(meta, "meta dataframe")
-    sayMeta(meta)
-    csvskip = 2                                   # skip first 2 lines describing the meeting
+    report()
+    report("watching", directory)
+    report("polling seconds", poll)
+    seen = {}                                     # path to last signature
+    settling = {}                                 # path to time its signature was first seen
+    processed = {}                                # path to content hash when last processed
+    try:
+        while True:
+            now = time.monotonic()
+            for path, signature in sorted(scanWatch(directory).items()):
+                if seen.get(path) != signature:   # new or changed, wait for it to settle
+                    seen[path] = signature
+                    settling[path] = now
+                    continue
+                if path not in settling or now - settling[path] < watchSettle:
+                    continue
+                del settling[path]
+                try:
+                    digest = fileHash(path).hexdigest()
+                except OSError:                   # moved or removed meanwhile, taken up again should it return
+                    seen.pop(path, None)
+                    continue
+                if processed.get(path) == digest:
+                    deport("unchanged", path)
+                    continue
+                processed[path] = digest
+                summary, log = batchWorker(path, options, verbose, digest)   # the cache lookup reuses the digest
+                if verbose and not quiet: print(log, end='')
+                report(path, summary['status'])
+                if profilefile: writeProfile(profilefile, [summary['profile']])
+            time.sleep(poll)
+    except KeyboardInterrupt:
+        report()
+        report("watch", "stopped")
+    return ExitCode.success.value
 
-df = readCsv(csvTarget, csvskip)
-sayDf(df, "original dataframe")
+# --------------------------------------
+#  server mode
+# --------------------------------------
 
-# truncate for development purposes as required
+# a resident process listens on a Unix domain socket and answers JSON lines,
+# one response line per request line, each analysis running in a warm process
+# pool as in batch mode
+#
+#   { "op" : "analyze", "csv" : "/abs/participants_1.csv", "cwd" : "/abs", "key" : "Email", ... }
+#   { "op" : "ping" }
+#   { "op" : "shutdown" }
 
-if args.length:
-    df = truncateDf(df, args.length)
+serveOps = ['analyze', 'ping', 'shutdown']
+serveKeys = ['Email', 'Name', 'Identity']
 
-# create recipient dataframe and report
+def serveWarm():                                  # pool initializer, pay the import costs once per worker
+    import importlib
+    for module in ['numpy', 'pandas', 'matplotlib']:
+        importlib.import_module(module)
 
-df2 = createSecondDf(df, participantKey)          # 'participantKey' either 'Name' or 'Email'
-sayDf(df2, "deduplicated dataframe")
+def serveArgs(request, cachedir, cachelimit):     # validate an analyze request and return the 'batchWorker' arguments
+    """map request fields onto the CSV target and options of 'batchWorker', raising ValueError on any bad field
 
-# stock recipient dataframe and report
+    * 'csv' is required, relative paths are taken against 'cwd', which is also where outputs go
+    * the cache settings are those of the server, not the client
+    """
 
-if ignoreGaps: df2 = stockSecondDfIgnoreGaps(df, df2, participantKey)
-else:          df2 = stockSecondDfConsiderGaps(df, df2, participantKey)
-sayDf(df2, "ratcheted dataframe", 0)              # zero is print entire dataframe
+    def field(name, default, kind):
+        value = request.get(name, default)
+        if value is not None and (not isinstance(value, kind) or (kind is int and isinstance(value, bool))):  # CAUTION: JSON true is an int
+            raise ValueError("request field '{0:s}' has the wrong type".format(name))
+        return value
+
+    def natural(name, default):                   # as 'argIsNatural' on the command line
+        value = field(name, default, int)
+        if value is not None and value < 0:
+            raise ValueError("request field '{0:s}' is not a non-negative integer".format(name))
+        return value
+
+    csvtarget = field('csv', None, str)
+    if not csvtarget:
+        raise ValueError("request lacks field 'csv'")
+    cwd = field('cwd', os.getcwd(), str)
+    if not os.path.isdir(cwd):
+        raise ValueError("request field 'cwd' is not a directory")
+    key = field('key', 'Email', str)
+    if key not in serveKeys:
+        raise ValueError("request field 'key' is not one of " + ", ".join(serveKeys))
+    engine = field('engine', 'c', str)
+    if engine not in csvEngines:
+        raise ValueError("request field 'engine' is not one of " + ", ".join(csvEngines))
+    plotformat = field('plotformat', 'svg', str)
+    if plotformat not in plotFormats:
+        raise ValueError("request field 'plotformat' is not one of " + ", ".join(plotFormats))
+    exports = field('exports', None, list)
+    if exports and not set(exports) <= set(exportFormats):
+        raise ValueError("request field 'exports' holds unknown formats")
+    retention = field('retention', None, (str, list))
+    if isinstance(retention, str):
+        retention = argCutoffs(retention)         # raises ArgumentTypeError, a ValueError
+    elif retention:                               # (number, percent) pairs as parsed by the client
+        try:
+            retention = [(float(number), bool(percent)) for number, percent in retention]
+        except (TypeError, ValueError):
+            raise ValueError("request field 'retention' is neither a cutoff list nor cutoff pairs")
+    windows = field('windows', None, list)
+    if windows:                                   # "first:last" strings or [first, last] pairs as parsed by the client
+        try:
+            windows = [argWindow(window) if isinstance(window, str) else (window[0], window[1]) for window in windows]
+        except (TypeError, IndexError):
+            raise ValueError("request field 'windows' is neither minute windows nor window pairs")
+        if not all(end is None or (isinstance(end, int) and not isinstance(end, bool)) for window in windows for end in window):
+            raise ValueError("request field 'windows' holds ends that are not whole minutes")
+    store = field('store', None, str)
+    if store:
+        store = os.path.join(cwd, store)
+    loopengine = bool(field('loopengine', False, bool))
+    options = batchOptions(key        = key,
+                           ignoregaps = bool(field('ignoregaps', False, bool)),
+                           loopengine = loopengine,
+                           cutoff     = natural('cutoff', cutoffDefault),
+                           title      = field('title', None, str),
+                           nominal    = natural('nominal', None),
+                           saveplot   = bool(field('saveplot', False, bool)),
+                           plotformat = plotformat,
+                           timeline   = bool(field('timeline', False, bool)),
+                           chunksize  = natural('chunksize', 0),
+                           cachedir   = None if loopengine else cachedir,   # as for the command line
+                           cachelimit = cachelimit,
+                           engine     = engine,
+                           store      = store,
+                           exports    = exports,
+                           retention  = retention,
+                           overlay    = bool(field('overlay', False, bool)),
+                           anomalies  = bool(field('anomalies', False, bool)),
+                           presence   = bool(field('presence', False, bool)),
+                           windows    = windows,
+                           throughout = bool(field('throughout', False, bool)))
+    return (os.path.join(cwd, csvtarget), options), cwd
+
+def serveWorker(cwd, args, talk):                 # run one analysis within a pool process and return summary and log
+    os.chdir(cwd)                                 # outputs land where the client asked, one task per process at a time
+    return batchWorker(*args, talk)
+
+def runServer(socketpath, jobs, cachedir, cachelimit):
+    """answer requests on the Unix domain socket 'socketpath' until interrupted or shut down, return an exit code
+
+    * each connection is served by its own thread and may carry several requests in turn
+    * analyses run in a pool of 'jobs' worker processes that import pandas and matplotlib once
+    * the socket is readable and writable by its owner only, and is removed on exit
+    """
 
-# extract column and report
+    import concurrent.futures
+    import socket
+    import socketserver
+    import threading
+
+    if os.path.lexists(socketpath):               # stale socket from an earlier server, unless one still answers
+        if not stat.S_ISSOCK(os.lstat(socketpath).st_mode):
+            report("not a socket", socketpath)    # never remove anything else
+            return ExitCode.serveIssue.value
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socketpath)
+            report("socket in use", socketpath)
+            return ExitCode.serveIssue.value
+        except OSError:
+            os.remove(socketpath)
+        finally:
+            probe.close()
+
+    pool = concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=serveWarm)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if not line.strip(): continue
+                response = self.answer(line)
+                self.wfile.write((json.dumps(response, default=str) + "\n").encode('utf-8'))
+                self.wfile.flush()
+                if response.get('op') == 'shutdown':
+                    threading.Thread(target=self.server.shutdown).start()   # not from the serving loop itself
+                    return
+
+        def answer(self, line):                   # return the response to one request line
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict): raise ValueError("request is not a JSON object")
+                op = request.get('op', 'analyze')
+                if op not in serveOps: raise ValueError("unknown op " + str(op))
+                if op != 'analyze':
+                    return { 'op' : op, 'status' : 'ok', 'version' : versionStr }
+                args, cwd = serveArgs(request, cachedir, cachelimit)
+            except ValueError as e:
+                report("bad request", e)
+                return { 'op' : 'error', 'status' : 'error: ' + ' '.join(str(e).split()) }
+            try:
+                summary, log = pool.submit(serveWorker, cwd, args, bool(request.get('verbose'))).result()
+            except Exception as e:                # outside the worker's own catch, a broken pool for one
+                report("serve issue", e)
+                return { 'op' : 'error', 'status' : 'error: ' + ' '.join(str(e).split()) }
+            report(summary['file'], summary['status'])
+            summary['op'] = 'analyze'
+            if request.get('verbose'): summary['log'] = log
+            return summary
+
+    class Server(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
 
-cumulatives = extractCol(df2, 'Delta', cutoff)
+    report()
+    report("serving", socketpath)
+    report("server workers", jobs)
+    server = Server(socketpath, Handler)
+    os.chmod(socketpath, stat.S_IRUSR | stat.S_IWUSR)  # owner only, set file permission to 0600
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.shutdown()
+        os.remove(socketpath)
+    report()
+    report("serve", "stopped")
+    return ExitCode.success.value
+
+def askServer(socketpath, request, timeout=serveTimeout):  # send one request to the server and return its response
+    import socket
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socketpath)
+        sock.sendall((json.dumps(request) + "\n").encode('utf-8'))
+        with sock.makefile('rb') as fd:
+            line = fd.readline()
+    if not line:
+        raise ConnectionError("server closed the connection")
+    return json.loads(line)
+
+def runClient(socketpath, csvtargets, request):
+    """send one analyze request per CSV file over concurrent connections and print each response as a JSON line
+
+    * 'request' holds the fields common to all files, paths are made absolute as the server has its own working directory
+    * responses are printed in file order, return an exit code
+    """
 
-# sum the deltas and report
+    import concurrent.futures
 
-cumminutes = sum(cumulatives)
-cumhours = cumminutes/60.0
-cumhourstr = format("%0.1f" % (cumhours))
-report("cumulative hours", cumhourstr)
+    requests = []
+    for csvtarget in csvtargets:
+        entry = dict(request, op='analyze', csv=os.path.abspath(csvtarget), cwd=os.getcwd())
+        if entry.get('store'): entry['store'] = os.path.abspath(entry['store'])
+        requests.append(entry)
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(requests))) as pool:
+            responses = list(pool.map(lambda entry: askServer(socketpath, entry), requests))
+    except (OSError, ValueError) as e:
+        report("server issue", e)
+        return ExitCode.serveIssue.value
+    failures = 0
+    for response in responses:
+        if verbose and not quiet: print(response.pop('log', ''), end='')
+        response.pop('log', None)
+        print(json.dumps(response, default=str))
+        if response['status'] != 'ok': failures += 1
+    if failures:
+        return ExitCode.batchIssue.value
+    return ExitCode.success.value
 
-# print column to file as required
+# --------------------------------------
+#  command-line interface
+# --------------------------------------
 
-if createDatFile:
-    stub = getStub()
-    mysep = "\n"                                  # one value per line
-    writeDatFile(stub + ".dat", cumulatives, mysep)
+def main(argv=None):                              # run the command-line utility and exit
+    global verbose, showDataframes
+
+    parser = makeParser()
+    args = parser.parse_args(argv)
+
+    # misuse of options
+
+    if not args.csv and not args.query and not args.watch and not args.serve:
+        parser.error("a CSV file is required unless watching, serving, or querying the store")
+    if args.csv and args.watch:
+        parser.error("option --watch takes no CSV files")
+    if args.poll and not args.watch:
+        parser.error("option --poll requires option --watch")
+    if args.query and not args.store:
+        parser.error("option --query requires option --store")
+    if args.windowall and not args.window:
+        parser.error("option --window-all requires option --window")
+    if args.overlay and not args.retention:
+        parser.error("option --retention-plot requires option --retention")
+    if args.serve and (args.csv or args.watch or args.connect):
+        parser.error("option --serve takes no CSV files nor options --watch and --connect")
+    if args.connect and (not args.csv or args.watch):
+        parser.error("option --connect requires CSV files and excludes option --watch")
+    if args.connect and stdinTarget in args.csv:
+        parser.error("option --connect cannot send standard input")
+    if args.merge and (not args.csv or args.watch or args.serve or args.connect or args.store):
+        parser.error("option --merge requires partial aggregate files and excludes options --watch, --serve, --connect, and --store")
+    if args.partialout and (args.watch or args.serve or args.connect):
+        parser.error("option --partial-out excludes options --watch, --serve, and --connect")
+    if args.partialout and not args.merge and not os.environ.get('ZOOMPART_SALT'):
+        parser.error("option --partial-out requires the environment variable ZOOMPART_SALT, else shards cannot be merged")
+    if args.partialout and args.fuzzyname:
+        parser.error("option --partial-out excludes option --fuzzy-name, whose identities depend on all names together")
+
+    if args.title and args.number:
+        raise argparse.ArgumentTypeError("cannot use options --title and --numbered-title simultaneously")
+    if args.noplot and args.saveplot:
+        raise argparse.ArgumentTypeError("cannot use options --no-plot and --save-plot simultaneously")
+    if args.noplot and args.headless:
+        raise argparse.ArgumentTypeError("cannot use options --no-plot and --headless simultaneously")
+
+    # for convenience
+
+    plotTitle = args.title
+    titleNumber = args.number
+    nominalDuration = args.duration
+    givenCutoff = args.cutoff
+    useName = args.usename
+    useFuzzyName = args.fuzzyname
+    createDatFile = args.dat
+    omitPlot = args.noplot
+    savePlotAlso = args.saveplot
+    headless = args.headless or noDisplay()       # render to file only
+    csvTargets = args.csv
+    jobCount = args.jobs
+    summaryFile = args.summary
+    chunkSize = args.chunksize
+    ignoreGaps = args.ignoregaps
+    loopEngine = args.loopengine
+    parserEngine = args.engine
+    if args.nocache: cacheDir = None
+    else:            cacheDir = cacheDirectory(args.cachedir)
+    if args.cachelimit is None: cacheLimit = cacheLimitDefault
+    else:                       cacheLimit = args.cachelimit
+    verbose = args.verbose
+    showDataframes = args.showdf
+    exitCode = ExitCode.success.value             # presume success
+
+    # outset reporting
+
+    report()                                      # add initial blank line
+    scriptVer()                                   # print script version
+    deport("verbose", "on")                       # report debug status
+    if args.showdf: deport("show dataframes", "on")
+    if args.length: deport("truncate", "active")
+    pythonVer()                                   # print python version
+
+    if args.merge:                                # partial aggregate files are taken as given
+        batchMode = False
+        report("partial files", len(csvTargets))
+    else:
+        csvTargets = expandTargets(csvTargets)
+        batchMode = len(csvTargets) > 1 or len(args.csv) > 1 or csvTargets != args.csv
+        if   batchMode:  report("targets", len(csvTargets))
+        elif csvTargets: report("target", csvTargets[0])
+    if batchMode and stdinTarget in csvTargets:
+        parser.error("standard input \"-\" takes no other CSV files")
+    if batchMode and args.partialout:
+        parser.error("option --partial-out takes a single CSV file, merge the partial aggregates of several with --merge")
+
+    # improve pandas terminal reporting, only relevant when printing dataframes
+
+    if showDataframes:
+        setPandasWide()
+
+    # process title
+
+    if titleNumber: plotTitle = numberedTitleFmt.format(titleNumber)
+    if plotTitle:   plotTitle = plotTitle.strip()
+    else:           plotTitle = standinPlotTitle
+    report("processed title", plotTitle)
+
+    # process deduplication key
+
+    if   useFuzzyName: participantKey = 'Identity'  # deduplicate by similar names
+    elif useName:      participantKey = 'Name'      # deduplicate by name, less reliable as subsequent attempts may use different string
+    else:              participantKey = 'Email'     # deduplicate by email address
+    report("deduplication key", "'" + participantKey + "'")
+
+    # process cutoff
+
+    if givenCutoff: cutoff = givenCutoff
+    else:           cutoff = cutoffDefault        # revert to default
+    report("cutoff minutes", cutoff)
+
+    # report again
+
+    if ignoreGaps: report("gap treatment", "simple difference between first appearance and final departure")
+    else:          report("gap treatment", "consider gaps and overlaps in attendance")
+    if not ignoreGaps and (chunkSize or args.merge or args.partialout):
+        report("caution", "durations from intervals are the union of sessions, lower than the default")
+        report("caution", "for a session nested in an earlier one then followed by another overlapping that one")
+    if   chunkSize:  report("stocking engine", "streaming in chunks of {0:d} rows".format(chunkSize))
+    elif loopEngine: report("stocking engine", "row-by-row reference loops")
+    else:            report("stocking engine", "grouped")
+    report("CSV engine", parserEngine)
+    if cacheDir: deport("results cache", cacheDir)
+    else:        deport("results cache", "bypassed")
+
+    if args.store: report("store", args.store)
+
+    # options shared by batch, watch, server, and client modes
+
+    if args.title or titleNumber: batchTitle = plotTitle
+    else:                         batchTitle = None                   # use meeting topic where available
+    options = batchOptions(key        = participantKey,
+                           ignoregaps = ignoreGaps,
+                           loopengine = loopEngine,
+                           cutoff     = cutoff,
+                           title      = batchTitle,
+                           nominal    = nominalDuration,
+                           saveplot   = savePlotAlso,
+                           plotformat = args.plotformat,
+                           timeline   = args.timeline,
+                           chunksize  = chunkSize or 0,
+                           cachedir   = cacheDir,
+                           cachelimit = cacheLimit,
+                           engine     = parserEngine,
+                           store      = args.store,
+                           exports    = args.export,
+                           retention  = args.retention,
+                           overlay    = args.overlay,
+                           anomalies  = args.anomalies,
+                           presence   = args.presence,
+                           windows    = args.window,
+                           throughout = args.windowall)
+
+    # watch mode has its own exit
+
+    if args.watch:
+        if not os.path.isdir(args.watch):
+            report("absent directory", args.watch)
+            myexit(ExitCode.noFile.value)
+        myexit(runWatch(args.watch, dict(options, saveplot=not omitPlot), args.profile, args.poll or watchPollDefault))
+
+    # server and client modes have their own exits
+
+    if args.serve:
+        myexit(runServer(args.serve, jobCount or os.cpu_count() or 1, cacheDir, cacheLimit))
+    if args.connect:
+        request = { name : value for name, value in options.items() if name not in ['cachedir', 'cachelimit', 'dat', 'plot', 'show'] }  # the server has its own cache and always renders headless
+        request['verbose'] = verbose
+        myexit(runClient(args.connect, csvTargets, request))
+
+    # store queries alone have their own exit
+
+    if not args.csv:
+        myexit(runQueries(args.store, args.query, cutoff))
+
+    # patterns and directories may yield nothing
+
+    if not csvTargets:
+        report("no CSV files found", " ".join(args.csv))
+        myexit(ExitCode.noFile.value)
+
+    # batch mode has its own exit
+
+    if batchMode:
+        if jobCount: jobs = jobCount
+        else:        jobs = os.cpu_count() or 1
+        exitCode = runBatch(csvTargets, jobs, options, summaryFile or batchSummaryDefault, args.profile)
+        if args.query:
+            exitCode = runQueries(args.store, args.query, cutoff) or exitCode
+        myexit(exitCode)
+
+    csvTarget = csvTargets[0]
+
+    # check CSV file, or each partial aggregate file, exists and is readable
+
+    for target in csvTargets:
+        if not (checkFile(target) if args.merge else checkTarget(target)):
+            report("absent or unreadable", target)
+            if args.profile:
+                writeProfile(args.profile, [{ 'target' : target, 'error' : "absent or unreadable" }])
+            myexit(ExitCode.noFile.value)
+
+    # read in, deduplicate, and stock CSV file, or merge partial aggregates
+
+    if args.merge:
+        try:
+            result = analyzePartials(csvTargets, ignoreGaps, cutoff)
+        except ValueError as e:
+            report("partial issue", e)
+            myexit(ExitCode.partialIssue.value)
+    else:
+        result = analyze(csvTarget, participantKey, ignoreGaps, cutoff, loopEngine, chunkSize, args.length, cacheDir, cacheLimit, parserEngine)
+
+    # partial aggregate as required
+
+    if args.partialout:
+        with result.profile.stage("partial") as record:
+            partial = partialState(result)
+            if not writePartial(args.partialout, partial):
+                exitCode = ExitCode.datIssue.value  # update exit code
+            record['rows'] = len(partial['participants'])
+
+    # DAT file, anomaly file, exports, timeline, presence, retention curve, plot, and store as required
+
+    if headless and not omitPlot and not args.headless:
+        report()
+        report("plot display", "none found, saving only")
+    code = writeOutputs(result, getStub(plotTitle), dict(options, title=plotTitle, dat=createDatFile, plot=not omitPlot, show=not headless))[0]
+    if code != ExitCode.success.value:
+        exitCode = code                           # update exit code
+
+    # store queries as required
+
+    if args.query:
+        exitCode = runQueries(args.store, args.query, cutoff) or exitCode
+
+    # profile as required
+
+    if args.profile:
+        if not writeProfile(args.profile, [result.profile.asDict()]):
+            exitCode = ExitCode.datIssue.value    # update exit code
 
-# plot as required
+    # housekeeping
 
-report()
-if omitPlot:
-    deport("omitting plot")
-else:
-    deport("creating plot")
-    stub = getStub()
-    plotList(cumulatives, plotTitle, stub)
-    if not savePlotAlso:
-        mvSvgCall(stub + ".svg")                  # passive reporting only
+    myexit(exitCode)
 
 # -------------------------------------
-#  housekeeping
+#  active code
 # -------------------------------------
 
-myexit(exitCode)
+if __name__ == '__main__':
+    main()
 
 # end of file